@@ -9,6 +9,8 @@ from ..dev.extract_signature import _extract_signature
 from ..code.operator_functions import op_properties
 
 class Value(ActionBase):
+    fusible = True
+
     def __init__(self, value):
         name = "Value"
         value_type = dtype.type_of_value(value)
@@ -21,7 +23,7 @@ class Value(ActionBase):
     def __repr__(self):
         return f"Value({self.value})"
 
-    def action_hash(self):
+    def _make_action_hash(self):
         salt_hash = data.hash("Value")
         # In the case of "action" value with action having no parameters, we have to distinguish
         # hash of the result of action from the hash of the action itself (result of the Value action).
@@ -39,6 +41,8 @@ class Pass(ActionBase):
     """
     Propagate given single argument. Do nothing action. Meant for internal usage in particular.
     """
+    fusible = True
+
     def __init__(self):
         t = dtype.TypeVar(name="T")
         p = ActionParameter('input', t)
@@ -60,6 +64,7 @@ class _ListBase(ActionBase):
     """
     # We assume that parameters are used only in reinit, which do not use it
     # in this case. After reinit one should use only self.arguments.
+    fusible = True
 
     def __init__(self, action_name):
         self.action_kind = base.ActionKind.Generic
@@ -97,6 +102,8 @@ class A_tuple(_ListBase):
 
 
 class A_dict(ActionBase):
+    fusible = True
+
     def __init__(self):
     	# TODO: TypeVar
         p =  ActionParameter(name='args', p_type=dtype.Tuple(dtype.Any, dtype.Any),
@@ -134,6 +141,8 @@ class ClassActionBase(ActionBase):
     Action constructs particular Dataclass given in constructor.
     So the action is parametrized by the 'data_class'.
     """
+    fusible = True
+
     def __init__(self, data_class, signature):
         super().__init__(data_class.__name__, signature)
         self._data_class = data_class
@@ -160,7 +169,7 @@ class ClassActionBase(ActionBase):
 
         return "\n".join(lines)
 
-    def action_hash(self):
+    def _make_action_hash(self):
         a_hash = data.hash(self.name)
         for param in self.parameters:
             a_hash = data.hash(param.name, previous=a_hash)
@@ -172,6 +181,8 @@ class EnumActionBase(ActionBase):
     """
     Conversion from int to the enum.
     """
+    fusible = True
+
     def __init__(self, enum_class):
         assert isinstance(enum_class, enum.EnumMeta), str(enum_class)
         enum_class.__visip_code__ = self.code_of_item
@@ -185,7 +196,7 @@ class EnumActionBase(ActionBase):
     def _evaluate(self, *args, **kwargs) -> dtype.DataClassBase:
         return self._enum_class(*args, **kwargs)
 
-    def action_hash(self):
+    def _make_action_hash(self):
         a_hash = data.hash(self.name)
         for param in self.parameters:
             a_hash = data.hash(param.name, previous=a_hash)
@@ -220,6 +231,8 @@ class _Operator(ActionBase):
         self.op_repr, self.precedence = op_properties[name]
         self._evaluate = op_fn
         super().__init__(name, signature)
+        self.fusible = name != 'matmul'
+        # Matrix product can be expensive.
 
     def higher_precedence(self, other: ActionBase):
         return isinstance(other, _Operator) and self.precedence > other.precedence
@@ -10,6 +10,8 @@ class GetAttribute(base.ActionBase):
     Return a class attribute for given fixed key.
     TODO: Do we really need the "configuration" data?
     """
+    fusible = True
+
     def __init__(self):
         signature = _extract_signature(self._evaluate)
         signature.check_no_empty()
@@ -34,6 +36,8 @@ class GetItem(base.ActionBase):
     Return item of a list or dict given by index or key.
     Note: Possibly we can distinguish GetItem and GetKey and have better typechecking for the index.
     """
+    fusible = True
+
     def __init__(self):
         var_type_t = dtype.TypeVar(name="T")
         params = (
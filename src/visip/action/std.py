@@ -1,6 +1,7 @@
 import os
 import io
 import sys
+import asyncio
 
 import attr
 import subprocess
@@ -80,9 +81,9 @@ class SysFile:
 Command = dtype.NewType(dtype.List(dtype.Union(dtype.Str, dtype.from_typing(FileIn))), 'Command')
 Redirection = dtype.NewType(dtype.Union(FileOut, dtype.NoneType, dtype.from_typing(SysFile)), 'Redirection')
 
-def _subprocess_handle(redirection):
+def _subprocess_handle(redirection, workdir=''):
     if type(redirection) is str:    # TODO: should be FileOut
-        return open(redirection, "w")
+        return open(os.path.join(workdir, redirection), "w")
     return redirection
 
 
@@ -126,6 +127,49 @@ def system(arguments: Command, stdout: Redirection = None, stderr: Redirection =
 
         return exec_result
 
+
+def _system_async(arguments, stdout=None, stderr=None, workdir=''):
+    """
+    Coroutine implementation of the 'system' action used by the AsyncResource.
+    The 'workdir' is resolved when the task is submitted, i.e. relative to the workspace
+    of the evaluation step, the coroutine runs later without changing the working directory.
+    """
+    return _run_system_async(arguments, stdout, stderr, os.path.abspath(workdir))
+
+
+async def _run_system_async(arguments, stdout, stderr, workdir):
+    """
+    Start the process in the absolute 'workdir'.
+    """
+    args = [str(arg) for arg in arguments]
+    stdout = _subprocess_handle(stdout, workdir)
+    stderr = _subprocess_handle(stderr, workdir)
+    if sys.platform == 'win32':
+        process = await asyncio.create_subprocess_shell(
+            subprocess.list2cmdline(args), stdout=stdout, stderr=stderr, cwd=workdir)
+    else:
+        process = await asyncio.create_subprocess_exec(*args, stdout=stdout, stderr=stderr, cwd=workdir)
+    out, err = await process.communicate()
+    exec_result = ExecResult(
+        args=args,
+        return_code=process.returncode,
+        workdir=workdir,
+        stdout=out,
+        stderr=err
+    )
+    try:
+        stdout.close()
+        stderr.close()
+    except AttributeError:
+        pass
+    if exec_result.return_code != 0:
+        exc.ExcVCommandFailed(str(args), exec_result)
+
+    return exec_result
+
+system.wrapped()._evaluate_async = _system_async
+
+
 @decorators.action_def
 def derived_file(f: FileIn, ext:dtype.Str) -> FileOut:
     base, old_ext = os.path.splitext (f.path)
@@ -65,15 +65,33 @@ round = action_def(round)
 pow = action_def(pow)
 divmod = action_def(divmod)
 
-@action_def
-def _is_none(x: dtype.Any) -> dtype.Bool:
-    return x is None
+While = public_action(meta._While())
+"""
+Meta action for the loop.
+
+Syntax:
+    While(body, previous)
+
+The 'body' action is applied to the loop state, starting with 'previous', until it returns None.
+The result is the last state other then None. The iterations are sequential, for independent
+calls of an action use ForEach. Equivalent workflow:
+
+    @workflow
+    def While(body, previous):
+        next = body(previous)
+        true_body = lazy(While, body, next)
+        false_body = lazy(Pass, previous)
+        return If(_is_none(next), false_body, true_body)
+"""
+ForEach = public_action(meta._ForEach())
+"""
+Meta action applying the 'body' action to every item of a list.
 
+Syntax:
+    ForEach(body, items)
 
+All calls of the 'body' are created in a single expansion and can be evaluated in parallel,
+the result is the list of the 'body' results. Use 'lazy' to bind other arguments of the body, e.g.
 
-@workflow
-def While(body, previous):
-    next = body(previous)
-    true_body = lazy(While, body, next)
-    false_body = lazy(Pass, previous)
-    return If(_is_none(next), false_body, true_body)
+    ForEach(lazy(my_action, empty, x), items)
+"""
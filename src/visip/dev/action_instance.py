@@ -158,6 +158,7 @@ class ActionCall:
 
         self.action = action
         """ The Action (instance of _ActionBase), have defined parameter. """
+        action.mark_used()
 
         self._type_var_map = {}
         """Map from TypeVars used in action definition to TypeVars used in Workflow type check."""
@@ -149,6 +149,8 @@ class _Workflow(meta.MetaAction):
         # list of errors after _check_types
         self._unable_check_types = False
         # if True types cannot be checked
+        self._expansion_plan_memo = None
+        # Pair (edit version, expansion plan), see '_expansion_plan'.
 
 
     @property
@@ -172,7 +174,7 @@ class _Workflow(meta.MetaAction):
     def status(self):
         return self._status
 
-    def action_hash(self):
+    def _make_action_hash(self):
         self.update()
         a_hash = data.hash(self.name)
         for acall in self._sorted_calls:
@@ -187,10 +189,12 @@ class _Workflow(meta.MetaAction):
         #     raise exceptions.ExcTypeBase(f"Wrong signature of workflow:  {func.__module__}.{func.__name__}") from e
         func_signature.process_empty(lambda var: dtype.TypeVar(origin_type=dtype.EmptyType, name="__Slot__"))
         self._parameters = func_signature
+        self.own_definition_modified()
 
         self._status = self.Status.no_result
 
     def set_result_action(self, action_call, slots):
+        self.own_definition_modified()
         if action_call is None:
             self._result_call = None
             self._status = self.Status.no_result
@@ -444,6 +448,7 @@ class _Workflow(meta.MetaAction):
         self._slots.insert(i_slot, _SlotCall(name, p_type))
         params.insert(i_slot, ActionParameter(name, p_type, default, kind))
         self._parameters = Parameters(params, self._parameters.return_type)
+        self.own_definition_modified()
         # no need to update
 
     def remove_slot(self, i_slot: int) -> None:
@@ -456,10 +461,12 @@ class _Workflow(meta.MetaAction):
         params = list(self._parameters)
         params.pop(i_slot)
         self._parameters = Parameters(params, self._parameters.return_type)
+        self.own_definition_modified()
 
     def remove_action(self, action_call: ActionCall) -> '_Workflow.Status':
         # TODO: check here and for other actions, that they are part of the workflow
         action_call.mark_invalid()
+        self.own_definition_modified()
         return self.update()
 
     def move_slot(self, from_pos, to_pos):
@@ -481,6 +488,7 @@ class _Workflow(meta.MetaAction):
         self._slots[to_pos] = from_slot
         params[to_pos] = from_param
         self._parameters = Parameters(params, self._parameters.return_type)
+        self.own_definition_modified()
         # no need to update
 
     def set_action_input(self, action_call: ActionCall, i_arg: int, input_action: Optional[ActionCall],
@@ -495,6 +503,7 @@ class _Workflow(meta.MetaAction):
         E.g. wf.set_action_input(list_1, 0, slot_a)
         """
         args, kwargs = action_call.id_args_pair
+        self.own_definition_modified()
 
         if i_arg is not None:
             # positional argument
@@ -559,6 +568,7 @@ class _Workflow(meta.MetaAction):
         :return:
         """
         self.result_call.output_type = result_type
+        self.own_definition_modified()
 
     def expand(self, task, task_creator, cache):
         """
@@ -573,23 +583,39 @@ class _Workflow(meta.MetaAction):
 
             In particular slots are named by corresponding parameter name and result task have name '__result__'
         """
-        if self.update() != self.Status.ok:
-            raise exceptions.ExcInvalidWorkflow(self.status)
+        plan = self._expansion_plan()
         childs = {}
-        tasks = {}
         assert len(self._slots) == len(task.inputs)
-        for slot, input in zip(self._slots, task.inputs):
-            # shortcut the slots
-            # task = task_creator(slot.name, Pass(), [input])
-            tasks[slot.name] = input
+        # shortcut the slots
+        tasks = list(task.inputs)
+        for action_call, action, id_args_pair, input_ids in plan:
+            # current name, the calls can be renamed without a modification of the definition
+            name = action_call.name
+            task_binding = TaskBinding(name, action, id_args_pair, [tasks[i] for i in input_ids])
+            child_task = task_creator(task_binding)
+            childs[name] = child_task
+            tasks.append(child_task)
+        return childs
+
+    def _expansion_plan(self):
+        """
+        Precompiled expansion of the workflow, memoized until a definition is modified.
+        :return: List of (action call, action, id_args_pair, input_ids) for the action calls in the topological order.
+            The 'input_ids' index the list of the slot inputs followed by the tasks of the previous action calls.
+        """
+        memo = self._expansion_plan_memo
+        if memo is not None and memo[0] == base.ActionBase._edit_version:
+            return memo[1]
+        if self.update() != self.Status.ok:
+            raise exceptions.ExcInvalidWorkflow(self.status)
+        ids = {slot.name: i for i, slot in enumerate(self._slots)}
+        plan = []
         for action_call in self._sorted_calls:
             if isinstance(action_call, _SlotCall):
                 continue
-            # TODO: eliminate dict usage, assign a call rank to the action calls
-            # TODO: use it to index tasks in the resulting task list 'childs'
-            arg_tasks = [tasks[arg.value.name] for arg in action_call.arguments]
-            task_binding = TaskBinding(action_call.name, action_call.action, action_call.id_args_pair, arg_tasks)
-            child_task = task_creator(task_binding)
-            childs[action_call.name] = child_task
-            tasks[action_call.name] = child_task
-        return childs
+            input_ids = tuple(ids[arg.value.name] for arg in action_call.arguments)
+            ids[action_call.name] = len(self._slots) + len(plan)
+            plan.append((action_call, action_call.action, action_call.id_args_pair, input_ids))
+        self._expansion_plan_memo = (base.ActionBase._edit_version, plan)
+        self.mark_used()
+        return plan
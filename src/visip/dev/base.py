@@ -1,4 +1,7 @@
 import enum
+import asyncio
+import inspect
+import concurrent.futures
 from . import data
 from . import dtype
 from .parameters import Parameters
@@ -68,14 +71,58 @@ class ActionBase(dtype._ActionBase):
     #     assert self.__visip_module__
     #     return self.__visip_module__
 
+    _edit_version = 0
+    # Incremented by every modification of the action definitions (workflow edits, renaming),
+    # invalidates the memoized action hashes, e.g. of the workflows calling the modified workflow.
+    _action_hash_memo = None
+    # Triple (edit version, hash backend, action hash).
+    _definition_used = False
+    # Set once the definition is called by other definition, hashed or expanded. Modifications
+    # of a definition not used yet (e.g. under construction) can not invalidate any memo.
+
+    @staticmethod
+    def definition_modified():
+        """
+        Must be called by every API modifying an action definition after its creation.
+        """
+        ActionBase._edit_version += 1
+
+    def mark_used(self):
+        """
+        Mark the definition as possibly used by other definitions or memos, see 'own_definition_modified'.
+        """
+        self._definition_used = True
+
+    def own_definition_modified(self):
+        """
+        Called by the APIs modifying this definition. The memos are invalidated only
+        if the definition is already used, so building a new workflow keeps them.
+        """
+        if self._definition_used:
+            ActionBase.definition_modified()
+
     def action_hash(self):
         """
         Hash of values representing the action. Hash must be different if the action
         produce different result for the same input.
+        Memoized until a definition is modified or the hash backend is changed,
+        computed by '_make_action_hash'.
+        :return:
+        """
+        memo = self._action_hash_memo
+        if memo is None or memo[0] != ActionBase._edit_version or memo[1] is not data.default_hash:
+            with data.action_hash_scope(self):
+                action_hash = self._make_action_hash()
+            memo = (ActionBase._edit_version, data.default_hash, action_hash)
+            self._action_hash_memo = memo
+            self._definition_used = True
+        return memo[2]
+
+    def _make_action_hash(self):
+        """
         TODO: Make generic implementation more general. Possibly replacing nearly all specializations.
         - hash action parameters
         - hash values of constant parameters
-        :return:
         """
         name_hash = data.hash((self.__module__, self.__name__))
         try:
@@ -84,7 +131,7 @@ class ActionBase(dtype._ActionBase):
             assert self._evaluate.__module__ == 'builtins'
             code = self.name
 
-        return data.hash(code.__hash__(), previous=name_hash)
+        return data.hash(code, previous=name_hash)
 
     @property
     def output_type(self):
@@ -100,10 +147,38 @@ class ActionBase(dtype._ActionBase):
         """
         Common evaluation function for all actions.
         Call _evaluate which actually implements the action.
+        Coroutine actions are run to completion in a temporary event loop. Called from a running
+        event loop (e.g. Evaluation.run_async without AsyncResource), the temporary loop runs
+        in an auxiliary thread, blocking the caller as any other synchronous action.
         :param inputs: List of arguments.
         :return: action result
         """
-        return self._evaluate(*args, **kwargs)
+        result = self._evaluate(*args, **kwargs)
+        if inspect.iscoroutine(result):
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(result)
+            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(asyncio.run, result).result()
+        return result
+
+    fusible = False
+    # The evaluation is negligible (constructors, item access, operators), the scheduler evaluates
+    # such tasks directly, fused with the cheap tasks depending on them.
+
+    _evaluate_async = None
+    # Optional coroutine function implementing the action, e.g. non-blocking variant of a system call.
+
+    @property
+    def async_evaluate_fn(self):
+        """
+        Coroutine function evaluating the action natively in an event loop, see AsyncResource.
+        None for actions without such implementation.
+        """
+        if inspect.iscoroutinefunction(self._evaluate):
+            return self._evaluate
+        return self._evaluate_async
 
 
     def _evaluate(self):
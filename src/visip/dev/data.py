@@ -6,23 +6,74 @@ We SHOULD support:
 - deserialization from a byte array
 - hash
 
+Serialization uses pickle protocol 5 with out-of-band buffers in a framed format, see 'dump'.
+
 TODO:
 - use renamed jsondata lib for serialization and deserialization of the VISIP data
-- need support for numpy objects
-- use serialized object for hashing instead of its str repr.
 - use some serious hashing function
 
 Same special dataclasses are implemented, in particular:
 - file wrapper
 - ...
 """
-from typing import NewType
+from typing import NewType, Iterable, Dict, BinaryIO
+import os
+import io
+import json
+import mmap
+import threading
 import pickle
 import hashlib
+import functools
+import contextlib
+import enum
+import struct
+import types
+import weakref
+import attr
+try:
+    import numpy as np
+except ModuleNotFoundError:
+    np = None
 
 HashValue = NewType('HashValue', bytes)
 
-default_hash = hashlib.sha256
+hash_backends = {
+    'sha256': hashlib.sha256,
+    'blake2b': functools.partial(hashlib.blake2b, digest_size=16),
+}
+"""
+Available hash functions, constructors of the hashlib like objects.
+"""
+try:
+    import xxhash
+    hash_backends['xxh128'] = xxhash.xxh3_128
+except ModuleNotFoundError:
+    pass
+
+default_hash = hash_backends['sha256']
+
+def set_hash_backend(name: str) -> str:
+    """
+    Set the hash function used for all hashes, return name of the previous one.
+    :param name: A key of the 'hash_backends'.
+    """
+    global default_hash
+    previous = _backend_name()
+    default_hash = hash_backends[name]
+    return previous
+
+@contextlib.contextmanager
+def hash_backend(name: str):
+    """
+    Context manager using the hash backend 'name' temporarily.
+    """
+    previous = set_hash_backend(name)
+    try:
+        yield
+    finally:
+        set_hash_backend(previous)
+
 def my_hash(x, seed=b""):
     m = default_hash()
     m.update(x)
@@ -43,50 +94,397 @@ def hash_stream(stream: bytearray, previous:HashValue=b"") -> HashValue:
     """
     return hasher_fn(stream, seed=previous)
 
-def hash(data, previous=b""):
-    #return hash_stream(str(data).encode('utf-8'), previous)
-    if isinstance(data, int):
-        int_data = int(data)
-        return hash_stream(int_data.to_bytes(8,'big',signed=True))
+def hash_list(hashes: Iterable[HashValue], previous: HashValue = b"") -> HashValue:
+    """
+    Hash of a sequence of hashes, e.g. the task ID given by the action hash and the input hashes.
+    Single hash object is updated by all the items.
+    """
+    m = default_hash()
+    for h in hashes:
+        m.update(h)
+    m.update(previous)
+    return m.digest()
 
-    hash_method = None
+_hash_scope = threading.local()
+# Per thread set of IDs of the actions with the action hash being computed.
+
+def _actions_in_hash() -> set:
     try:
-        hash_method = data.__hash__
+        return _hash_scope.actions
     except AttributeError:
-        pass
-    if hash_method is not None:
-        return hash_stream(hash_method().to_bytes(8, 'big', signed=True), previous)
-    else:
-        return hash_stream(str(data).encode('utf-8'), previous)
+        _hash_scope.actions = set()
+        return _hash_scope.actions
 
-def hash_file(file_path):
-    # BUF_SIZE is totally arbitrary, change for your app!
-    BUF_SIZE = 65536  # lets read stuff in 64kb chunks!
-    m = default_hash()
+@contextlib.contextmanager
+def action_hash_scope(action):
+    """
+    Mark the action as being hashed by the current thread, used by ActionBase.action_hash.
+    Within the scope the action as a value is hashed by its name, see '_DataHasher'.
+    """
+    actions = _actions_in_hash()
+    actions.add(id(action))
+    try:
+        yield
+    finally:
+        actions.discard(id(action))
+
+def hash(data, previous=b""):
+    """
+    Content based hash of a data tree.
+    Basic types, lists, tuples, dicts, sets, attrs classes (including DataClassBase), enums,
+    NumPy arrays and actions are hashed structurally, see '_DataHasher'.
+    Other objects are hashed through their __hash__ method if defined or through their str representation.
+    """
+    return _DataHasher().hash(data, previous)
+
+
+class _DataHasher:
+    """
+    Structural hasher of the data trees.
+    Every value is fed into the hash object as a type tag followed by its content.
+    Containers, attrs instances and arrays are hashed into separate digests memoized by the object ID
+    so that repeated subtrees are hashed only once. Digests of NumPy arrays with immutable
+    buffers (e.g. deserialized or memory mapped results) are memoized also between calls.
+    """
+    _array_memo: Dict[tuple, HashValue] = {}
+    # Digests of the immutable arrays by their ID and the hash backend,
+    # items are removed when the array is deleted.
+
+    def __init__(self):
+        self._memo: Dict[int, HashValue] = {}
+        # Digests of the containers within single 'hash' call.
+        self._keep_alive = []
+        # Keep memoized objects alive during the call in order to keep their IDs unique.
+
+    def hash(self, data, previous=b""):
+        m = default_hash()
+        self._update(m, data)
+        m.update(previous)
+        return m.digest()
+
+    def _digest(self, data, update_fn):
+        key = id(data)
+        try:
+            return self._memo[key]
+        except KeyError:
+            pass
+        m = default_hash()
+        update_fn(m, data)
+        digest = m.digest()
+        self._memo[key] = digest
+        self._keep_alive.append(data)
+        return digest
+
+    def _update(self, m, data):
+        if data is None:
+            m.update(b'N')
+        elif isinstance(data, enum.Enum):
+            m.update(b'E')
+            self._update_name(m, type(data))
+            self._update(m, data.value)
+        elif isinstance(data, bool):
+            m.update(b'T' if data else b'F')
+        elif isinstance(data, int):
+            m.update(b'I')
+            m.update(data.to_bytes((data.bit_length() + 8) // 8, 'big', signed=True))
+        elif isinstance(data, float):
+            m.update(b'D')
+            m.update(struct.pack('<d', data))
+        elif isinstance(data, str):
+            self._update_bytes(m, b'S', data.encode('utf-8'))
+        elif isinstance(data, (bytes, bytearray, memoryview)):
+            self._update_bytes(m, b'Y', data)
+        elif isinstance(data, (list, tuple)):
+            m.update(b'L' if isinstance(data, list) else b'P')
+            m.update(self._digest(data, self._update_sequence))
+        elif isinstance(data, dict):
+            m.update(b'M')
+            m.update(self._digest(data, self._update_dict))
+        elif isinstance(data, (set, frozenset)):
+            m.update(b'U')
+            m.update(self._digest(data, self._update_set))
+        elif np is not None and isinstance(data, np.ndarray):
+            m.update(b'A')
+            m.update(self._array_digest(data))
+        elif np is not None and isinstance(data, np.generic):
+            m.update(b'G')
+            self._update_bytes(m, data.dtype.str.encode(), data.tobytes())
+        elif attr.has(type(data)):
+            m.update(b'C')
+            self._update_name(m, type(data))
+            m.update(self._digest(data, self._update_attrs))
+        elif isinstance(data, type) or isinstance(data, types.FunctionType):
+            m.update(b'R')
+            self._update_name(m, data)
+        elif isinstance(data, types.CodeType):
+            m.update(b'K')
+            m.update(self._digest(data, self._update_code))
+        elif callable(getattr(type(data), 'action_hash', None)):
+            # Actions as values are identified by their action hash, i.e. by the definition.
+            # Just by the name within the hash of the action itself, e.g. a recursive workflow.
+            m.update(b'Z')
+            self._update_name(m, type(data))
+            if id(data) in _actions_in_hash():
+                self._update(m, (getattr(data, '__module__', None), getattr(data, 'name', None)))
+            else:
+                self._update_bytes(m, b'Y', data.action_hash())
+        elif type(data).__hash__ not in (None, object.__hash__):
+            m.update(b'H')
+            m.update(data.__hash__().to_bytes(8, 'big', signed=True))
+        else:
+            self._update_bytes(m, b'O', str(data).encode('utf-8'))
+
+    @staticmethod
+    def _update_bytes(m, tag, data):
+        m.update(tag)
+        m.update(len(data).to_bytes(8, 'big'))
+        m.update(data)
+
+    def _update_name(self, m, obj):
+        name = f"{getattr(obj, '__module__', '')}.{getattr(obj, '__qualname__', '')}"
+        self._update_bytes(m, b'S', name.encode('utf-8'))
+
+    def _update_sequence(self, m, data):
+        m.update(len(data).to_bytes(8, 'big'))
+        for item in data:
+            self._update(m, item)
 
+    def _update_dict(self, m, data):
+        # independent of the insertion order
+        items = sorted(self._digest((key, value), self._update_sequence) for key, value in data.items())
+        self._update_sequence(m, items)
+
+    def _update_set(self, m, data):
+        items = sorted(self._digest((item,), self._update_sequence) for item in data)
+        self._update_sequence(m, items)
+
+    def _update_attrs(self, m, data):
+        for field in attr.fields(type(data)):
+            self._update(m, field.name)
+            self._update(m, getattr(data, field.name))
+
+    def _update_code(self, m, code):
+        self._update_bytes(m, b'Y', code.co_code)
+        self._update(m, code.co_consts)
+        self._update(m, code.co_names)
+        self._update(m, code.co_varnames)
+
+    @staticmethod
+    def _is_immutable(array):
+        """
+        True if the array data can not change, i.e. the array is a view into bytes
+        or into a read only memory map. Read only flag is not enough, the flag can be reset
+        or the array can be a read only view of a writable array.
+        """
+        base = array
+        while isinstance(base, np.ndarray):
+            if base.flags.writeable:
+                return False
+            base = base.base
+        if isinstance(base, memoryview):
+            if not base.readonly:
+                return False
+            base = base.obj
+        if isinstance(base, bytes):
+            return True
+        if isinstance(base, mmap.mmap):
+            try:
+                return memoryview(base).readonly
+            except ValueError:
+                # closed map
+                return False
+        return False
+
+    def _array_digest(self, array):
+        immutable = not array.flags.writeable and self._is_immutable(array)
+        key = (id(array), default_hash)
+        if immutable and key in self._array_memo:
+            return self._array_memo[key]
+        m = default_hash()
+        self._update_bytes(m, b'S', array.dtype.str.encode())
+        self._update(m, array.shape)
+        if array.dtype.hasobject:
+            self._update(m, array.tolist())
+        else:
+            # no copy for contiguous arrays
+            m.update(memoryview(np.ascontiguousarray(array)).cast('B'))
+        digest = m.digest()
+        if immutable:
+            self._array_memo[key] = digest
+            weakref.finalize(array, self._array_memo.pop, key, None)
+        return digest
+
+def _backend_name() -> str:
+    return next(key for key, backend in hash_backends.items() if backend is default_hash)
+
+def _hash_file_content(file_path) -> HashValue:
+    """
+    Hash of the file content. Small files are read at once, large files are memory mapped
+    and hashed in large chunks (hashlib releases GIL for them).
+    """
+    CHUNK_SIZE = 1 << 24
+    m = default_hash()
     with open(file_path, 'rb') as f:
-        while True:
-            data = f.read(BUF_SIZE)
-            if not data:
-                break
-            m.update(data)
+        size = os.fstat(f.fileno()).st_size
+        if size < CHUNK_SIZE:
+            m.update(f.read())
+        else:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                for begin in range(0, size, CHUNK_SIZE):
+                    m.update(view[begin:begin + CHUNK_SIZE])
+                view.release()
     return m.digest()
 
 
-def serialize(data):
+class FileHashIndex:
+    """
+    Persistent memo of the file hashes.
+    The hash of a file is reused as long as its absolute path, size, modification time and inode
+    are the same. The index is saved as a JSON file, typically in the workspace.
+    """
+    def __init__(self, index_path: str = None):
+        """
+        :param index_path: Path to the index file, loaded if exists. No persistence if None.
+        """
+        self.index_path = index_path
+        self._index: Dict[str, list] = {}
+        # abs path -> [size, mtime_ns, inode, hash backend, hex hash]
+        self._lock = threading.Lock()
+        self._modified = False
+        if index_path is not None and os.path.isfile(index_path):
+            try:
+                with open(index_path, 'r') as f:
+                    self._index = json.load(f)
+            except ValueError:
+                # corrupted index, rebuild
+                pass
+
+    def hash_file(self, file_path) -> HashValue:
+        full_path = os.path.abspath(file_path)
+        stat = os.stat(full_path)
+        key = [stat.st_size, stat.st_mtime_ns, stat.st_ino, _backend_name()]
+        with self._lock:
+            item = self._index.get(full_path, None)
+        if item is not None and item[:4] == key:
+            return bytes.fromhex(item[4])
+        file_hash = _hash_file_content(full_path)
+        with self._lock:
+            self._index[full_path] = key + [file_hash.hex()]
+            self._modified = True
+        return file_hash
+
+    def save(self):
+        """
+        Write the index file if there are any changes.
+        """
+        if self.index_path is None or not self._modified:
+            return
+        with self._lock:
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._index, f)
+            os.replace(tmp_path, self.index_path)
+            self._modified = False
+
+
+file_hash_index: FileHashIndex = None
+"""
+Index used by 'hash_file', set by the Evaluation for its workspace.
+"""
+
+@contextlib.contextmanager
+def use_file_hash_index(index: FileHashIndex):
     """
-    Serialize a data tree 'data' into a byte array.
+    Context manager setting the 'file_hash_index' temporarily, the index is saved at exit.
+    """
+    global file_hash_index
+    previous = file_hash_index
+    file_hash_index = index
+    try:
+        yield index
+    finally:
+        file_hash_index = previous
+        index.save()
+
+def hash_file(file_path):
+    """
+    Hash of the file content, memoized in the 'file_hash_index' if set.
+    """
+    if file_hash_index is None:
+        return _hash_file_content(file_path)
+    return file_hash_index.hash_file(file_path)
+
+
+_FRAME_MAGIC = b'VISIPR01'
+_FRAME_ALIGN = 64
+_FRAME_HEAD = struct.Struct('<8sQQ')
+# magic, number of buffers, pickle stream length
+_FRAME_BUFFER = struct.Struct('<QQ')
+# offset, length of a buffer
+
+
+def dump(data, stream: BinaryIO):
+    """
+    Write the data tree to the binary stream in the VISIP result format:
+
+        head: magic, n_buffers, pickle_len
+        n_buffers x (offset, length)
+        pickle stream (protocol 5)
+        out-of-band buffers, every aligned to 64 bytes with respect to the frame start
+
+    Objects supporting pickle protocol 5 out-of-band buffers (NumPy arrays, bytearray) are not copied
+    into the pickle stream, so they can be loaded as views into e.g. a memory mapped file.
+    """
+    buffers = []
+    pickle_stream = pickle.dumps(data, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+    head_size = _FRAME_HEAD.size + len(raws) * _FRAME_BUFFER.size
+    offset = head_size + len(pickle_stream)
+    offsets = []
+    for raw in raws:
+        offset = -(-offset // _FRAME_ALIGN) * _FRAME_ALIGN
+        offsets.append(offset)
+        offset += raw.nbytes
+    stream.write(_FRAME_HEAD.pack(_FRAME_MAGIC, len(raws), len(pickle_stream)))
+    for buffer_offset, raw in zip(offsets, raws):
+        stream.write(_FRAME_BUFFER.pack(buffer_offset, raw.nbytes))
+    stream.write(pickle_stream)
+    position = head_size + len(pickle_stream)
+    for buffer_offset, raw in zip(offsets, raws):
+        stream.write(bytes(buffer_offset - position))
+        stream.write(raw)
+        position = buffer_offset + raw.nbytes
+
+
+def serialize(data) -> bytes:
+    """
+    Serialize a data tree 'data' into a byte array, see 'dump' for the format.
     :param data:
     :return:
     """
-
-    return pickle.dumps(data)
+    stream = io.BytesIO()
+    dump(data, stream)
+    return stream.getvalue()
 
 
 def deserialize(stream: bytearray):
     """
     Deserialize a data tree.
-    :param stream:
+    The out-of-band buffers are not copied, e.g. NumPy arrays are views into the 'stream',
+    read only if the stream is read only (bytes, memory mapped file).
+    Plain pickle streams are accepted as well.
+    :param stream: bytes like object
     :return:
     """
-    return pickle.loads(stream)
\ No newline at end of file
+    view = memoryview(stream)
+    if bytes(view[:len(_FRAME_MAGIC)]) != _FRAME_MAGIC:
+        return pickle.loads(view)
+    magic, n_buffers, pickle_len = _FRAME_HEAD.unpack_from(view, 0)
+    position = _FRAME_HEAD.size
+    buffers = []
+    for i in range(n_buffers):
+        offset, length = _FRAME_BUFFER.unpack_from(view, position)
+        position += _FRAME_BUFFER.size
+        buffers.append(view[offset:offset + length])
+    return pickle.loads(view[position:position + pickle_len], buffers=buffers)
@@ -12,18 +12,27 @@ Evaluation of a workflow.
 """
 import sys
 import os
-from typing import Optional, List, Dict, Tuple, Any, Union
+from typing import Optional, List, Dict, Set, Tuple, Any, Union, Callable
 import logging
 import heapq
 import time
+import importlib
+import functools
+import pickle
+import concurrent.futures
+import contextlib
+import threading
+import asyncio
 
 from . import data, task as task_mod, base, dfs, action_instance as instance, dtype
 from .task_result import TaskResult
 from .action_workflow import _Workflow
-from ..eval.cache import ResultCache
+from ..eval.cache import ResultCache, BoundedResultCache
+from ..eval.time_model import ExecutionTimeModel
 from ..code.unwrap import into_action
 from ..code.dummy import Dummy, DummyAction, DummyWorkflow
 from . import tools
+from .indexed_heap import IndexedHeap
 
 
 class Resource:
@@ -36,9 +45,10 @@ class Resource:
     We shall start with fixed number of resources, dynamic creation of executing PBS jobs can later be done.
 
     """
-    def __init__(self, cache:ResultCache):
+    def __init__(self, cache:ResultCache = None):
         """
         Initialize time scaling and other features of the resource.
+        :param cache: Result cache, if None the cache of the Evaluation is set.
         """
         self.start_latency = 0.0
         # Average time from assignment to actual execution of the task. [seconds]
@@ -51,7 +61,9 @@ class Resource:
         self.n_mpi_proces = 0
         # Maximal number of MPI processes one can assign.
         self._finished = []
-
+        self.notify: Callable[[], None] = lambda: None
+        # Called when a task is finished, possibly from other thread. Set by the Scheduler
+        # to wake up the evaluation loop.
 
         self.cache = cache
 
@@ -96,13 +108,249 @@ class Resource:
             #    print(task.action, data_inputs)
             assert not any([i is self.cache.NoValue for i in data_inputs])
             args, kwargs = task.inputs_to_args(data_inputs)
-            res_value = task.evaluate_fn(*args, **kwargs)
+            res_value, task.wall_time = _timed_call(task.evaluate_fn, *args, **kwargs)
             # print(task.action)
             # print(task.inputs)
             # print(task_hash, res_value)
             self.cache.insert(task.result_hash, res_value)
 
         self._finished.append(task)
+        self.notify()
+
+    @property
+    def n_running(self):
+        """
+        Number of submitted tasks that are not yet returned by 'get_finished'.
+        The basic resource evaluates immediately, so nothing is running.
+        """
+        return 0
+
+    @property
+    def is_full(self):
+        """
+        True if the resource can not start a next task now. The scheduler keeps further tasks
+        in its ready queue, so that the most urgent tasks are submitted first.
+        """
+        return False
+
+
+def _timed_call(fn, *args, **kwargs):
+    """
+    Return result of the call and its wall time [seconds].
+    """
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+async def _timed_await(coroutine):
+    """
+    Return result of the coroutine and its wall time [seconds].
+    """
+    start = time.perf_counter()
+    result = await coroutine
+    return result, time.perf_counter() - start
+
+
+def _call_action_by_reference(module_name, name, *args, **kwargs):
+    """
+    Evaluate an action given by the module level name of its wrapper.
+    Used by the ProcessPoolResource as the actions themselves can not be pickled.
+    """
+    action = getattr(importlib.import_module(module_name), name)
+    if isinstance(action, DummyAction):
+        action = action._action_value
+    return action.evaluate(*args, **kwargs)
+
+
+def _evaluate_payload(payload):
+    """
+    Evaluate serialized (evaluate_fn, args, kwargs) in the worker process,
+    return the serialized result and the evaluation time.
+    """
+    evaluate_fn, args, kwargs = data.deserialize(payload)
+    result, wall_time = _timed_call(evaluate_fn, *args, **kwargs)
+    return data.serialize(result), wall_time
+
+
+class _PoolResource(Resource):
+    """
+    Common base of the resources evaluating atomic tasks asynchronously in a concurrent.futures executor.
+    The results are inserted into the cache in 'get_finished', i.e. in the scheduler's thread.
+    Tasks that can not be passed to the executor are evaluated immediately during submit as in the base Resource.
+    """
+    def __init__(self, cache: ResultCache = None, n_threads: int = None):
+        """
+        :param n_threads: Number of workers, number of CPUs by default.
+        """
+        super().__init__(cache)
+        if n_threads is None:
+            n_threads = os.cpu_count() or 1
+        self.n_threads = n_threads
+        self._executor = None
+        # The pool is started at the first remote submit.
+        self._running: Dict[concurrent.futures.Future, task_mod._TaskBase] = {}
+        # Futures of the running tasks.
+
+    @property
+    def n_running(self):
+        return len(self._running)
+
+    @property
+    def is_full(self):
+        return len(self._running) >= self.n_threads
+
+    def _make_executor(self) -> concurrent.futures.Executor:
+        assert False, "Not implemented"
+
+    def _submit_to_executor(self, task, args, kwargs) -> Optional[concurrent.futures.Future]:
+        """
+        Submit evaluation of the task to the executor, return None if not possible.
+        """
+        assert False, "Not implemented"
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = self._make_executor()
+        return self._executor
+
+    def _result(self, future):
+        """
+        Return the result value and the evaluation time.
+        """
+        return future.result()
+
+    def get_finished(self):
+        """
+        Return list of the tasks finished since the last call.
+        Do not wait for the running tasks.
+        """
+        for future in [f for f in self._running if f.done()]:
+            task = self._running.pop(future)
+            value, task.wall_time = self._result(future)
+            self.cache.insert(task.result_hash, value)
+            self._finished.append(task)
+        return super().get_finished()
+
+    def submit(self, task):
+        """
+        Submit the task to the pool, the finished task is returned by a later call of 'get_finished'.
+        :param task:
+        :return:
+        """
+        if self.cache.is_finished(task.result_hash):
+            self._finished.append(task)
+            self.notify()
+            return
+        if task.action.task_type is base.TaskType.Atomic:
+            data_inputs = [self.cache.value(ih) for ih in task.input_hashes]
+            assert not any([i is self.cache.NoValue for i in data_inputs])
+            args, kwargs = task.inputs_to_args(data_inputs)
+            future = self._submit_to_executor(task, args, kwargs)
+            if future is not None:
+                self._running[future] = task
+                future.add_done_callback(lambda f: self.notify())
+                return
+        super().submit(task)
+
+    def shutdown(self):
+        """
+        Wait for the running tasks and stop the workers.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+class ThreadPoolResource(_PoolResource):
+    """
+    Resource evaluating atomic tasks in a pool of 'n_threads' threads.
+    Suitable for the actions releasing GIL, e.g. `system` calls or file hashing, as there is no
+    need to pickle the actions or the data.
+    """
+    def _make_executor(self):
+        return concurrent.futures.ThreadPoolExecutor(max_workers=self.n_threads)
+
+    def _submit_to_executor(self, task, args, kwargs):
+        return self.executor.submit(_timed_call, task.evaluate_fn, *args, **kwargs)
+
+
+class ProcessPoolResource(_PoolResource):
+    """
+    Resource evaluating atomic tasks in a pool of worker processes.
+
+    Only the evaluate function and the resolved input data are passed to the workers,
+    both the inputs and the result are passed in the VISIP result format (see data.dump).
+    The actions are not picklable, so the evaluate function is passed
+    by reference to its module level definition (e.g. functions decorated by `action_def`).
+    Tasks that can not be passed to the worker (composed tasks, actions defined out of a module,
+    unpicklable inputs) are evaluated immediately during submit as in the base Resource.
+    """
+    def __init__(self, cache: ResultCache = None, n_workers: int = None):
+        """
+        :param n_workers: Number of worker processes, number of CPUs by default.
+        """
+        super().__init__(cache, n_threads=n_workers)
+
+    def _make_executor(self):
+        return concurrent.futures.ProcessPoolExecutor(max_workers=self.n_threads)
+
+    def _result(self, future):
+        payload, wall_time = future.result()
+        return data.deserialize(payload), wall_time
+
+    @staticmethod
+    def _remote_evaluate_fn(task):
+        """
+        Return picklable equivalent of the task.evaluate_fn or None if there is no such.
+        """
+        fn = task.action.__dict__.get('_evaluate', None)
+        # Only actions with the evaluate function defined at the module level.
+        module = sys.modules.get(getattr(fn, '__module__', None), None)
+        if module is None:
+            return None
+        wrapper = getattr(module, fn.__qualname__, None)
+        if wrapper is fn:
+            return fn
+        if isinstance(wrapper, DummyAction) and wrapper._action_value is task.action:
+            return functools.partial(_call_action_by_reference, fn.__module__, fn.__qualname__)
+        return None
+
+    def _submit_to_executor(self, task, args, kwargs):
+        evaluate_fn = self._remote_evaluate_fn(task)
+        if evaluate_fn is None:
+            return None
+        try:
+            payload = data.serialize((evaluate_fn, args, kwargs))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return None
+        return self.executor.submit(_evaluate_payload, payload)
+
+
+class AsyncResource(_PoolResource):
+    """
+    Resource evaluating atomic tasks of the actions with a coroutine implementation
+    (see ActionBase.async_evaluate_fn), e.g. `async def` functions decorated by `action_def` or
+    the `system` action, as tasks of the running asyncio event loop. So many concurrent subprocesses
+    need no thread per task. Other tasks are evaluated immediately during submit as in the base Resource.
+    Intended for Evaluation.run_async, without a running event loop all tasks are evaluated immediately.
+    """
+    def __init__(self, cache: ResultCache = None, max_tasks: int = 1024):
+        """
+        :param max_tasks: Maximal number of concurrently running tasks.
+        """
+        super().__init__(cache, n_threads=max_tasks)
+
+    def _submit_to_executor(self, task, args, kwargs):
+        coroutine_fn = task.action.async_evaluate_fn
+        if coroutine_fn is None:
+            return None
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+        return loop.create_task(_timed_await(coroutine_fn(*args, **kwargs)))
 
 
 class EvalLogger:
@@ -145,9 +393,11 @@ class EvalLogger:
         #     self._logger.info(f"    Can not expand yet.")
 
 class Scheduler:
-    def __init__(self, resources:Resource, cache:ResultCache, n_tasks_limit:int = 1024):
+    def __init__(self, resources:Resource, cache:ResultCache, n_tasks_limit:int = 1024,
+                 release_intermediates: bool = False):
         """
         :param tasks_dag: Tasks to be evaluated.
+        :param release_intermediates: Release results from the cache as soon as all their consumers are finished.
         """
 
         self.resources = resources
@@ -161,10 +411,16 @@ class Scheduler:
         self.tasks = {}
         # all not yet sumitted tasks, vertices of the DAG that is optimized by the scheduler
         # maps task ID to the task
+        self._needed: Dict[bytes, int] = {}
+        # Number of the not yet submitted tasks consuming the result hash, see 'needed_hashes'.
+        self._counted_inputs: Dict[bytes, tuple] = {}
+        # Input hashes counted in '_needed' for the task ID, the inputs change by the expansion.
 
-        self._ready_queue = []
+        self._ready_queue = IndexedHeap()
         # Priority queue of the 'ready' tasks.  Used to submit the ready tasks without
-        # whole DAG optimization. Priority is the
+        # whole DAG optimization. The priority is given by the slack time computed in 'optimize'
+        # and updated for the queued tasks as their tail time grows.
+        # Every task enters the queue once, when its last dependency is finished.
 
         self._task_map = {}
         # Maps task.result_hash to list of scheduler tasks.
@@ -172,8 +428,15 @@ class Scheduler:
         self._start_time = time.perf_counter()
         # Start time of the DAG evaluation.
 
-        self._topology_sort = []
-        # Topological sort of the tasks.
+        self._new_tasks = []
+        # Tasks appended since the last optimization.
+        self._waiting: Set[bytes] = set()
+        # IDs of the not submitted tasks that wait just for the results of the expanded composed tasks.
+
+        self.release_intermediates = release_intermediates
+        # Release results with all consumers finished.
+        self._producers: Dict[bytes, List[task_mod.TaskSchedule]] = {}
+        # Maps result_hash to the tasks producing it, used to release results.
 
 
         self._resource_map = {base.ActionKind.Regular: [],
@@ -185,16 +448,83 @@ class Scheduler:
             for kind in res.action_kind_list:
                 self._resource_map[kind].append(i)
 
+        self._finished_event = threading.Event()
+        # Set when a task is finished since the last update, possibly by a resource thread.
+        self.wait_timeout = 1.0
+        # Limit of a single wait, a safety for resources that do not notify. [seconds]
+        self._wakeup: Optional[Callable[[], None]] = None
+        # Wakes up 'wait_async', set during the waiting.
+        for res in self.resources:
+            res.notify = self._notify
+        self._fusion_resource = Resource(cache)
+        # Evaluates the fused tasks directly.
+        self.on_finished: Optional[Callable[[task_mod.TaskSchedule], None]] = None
+        # Called for every finished task, set by the Evaluation.
+
+    def reset(self):
+        """
+        Drop the tasks of the previous evaluation, keep the resources and the cache.
+        Results of the tasks still running on the resources are inserted into the cache when collected.
+        """
+        self.tasks = {}
+        self._needed = {}
+        self._counted_inputs = {}
+        self._ready_queue = IndexedHeap()
+        self._task_map = {}
+        self._new_tasks = []
+        self._waiting = set()
+        self._producers = {}
+        self._start_time = time.perf_counter()
+
     def can_expand(self):
-        return self.n_assigned_tasks < self.n_tasks_limit
+        # Tasks waiting just for the expanded composed tasks, e.g. nested iterations of While,
+        # do not count to the limit.
+        return self.n_assigned_tasks - len(self._waiting) < self.n_tasks_limit
+
+    def is_idle(self):
+        """
+        True if there are no ready or running tasks, i.e. no progress without the DAG expansion.
+        """
+        return not self._ready_queue and self.n_running_tasks == 0
 
     @property
     def n_assigned_tasks(self):
         return len(self.tasks)
 
+    @property
+    def n_running_tasks(self):
+        """
+        Number of tasks submitted to the resources and not collected yet.
+        """
+        return sum(res.n_running for res in self.resources)
+
     def is_finished(self, task: task_mod.TaskSchedule):
         return self.cache.is_finished(task.result_hash)
 
+    def needed_hashes(self):
+        """
+        Return set of input hashes of the not yet submitted tasks.
+        A live view, maintained as the tasks are added and submitted.
+        """
+        return self._needed.keys()
+
+    def _add_task(self, task):
+        self._pop_task(task.id)
+        self.tasks[task.id] = task
+        input_hashes = task.task.input_hashes
+        self._counted_inputs[task.id] = input_hashes
+        for ih in input_hashes:
+            self._needed[ih] = self._needed.get(ih, 0) + 1
+
+    def _pop_task(self, task_id):
+        self.tasks.pop(task_id, None)
+        for ih in self._counted_inputs.pop(task_id, ()):
+            n_tasks = self._needed[ih] - 1
+            if n_tasks:
+                self._needed[ih] = n_tasks
+            else:
+                del self._needed[ih]
+
 
     def get_time(self):
         return time.perf_counter() - self._start_time
@@ -205,11 +535,58 @@ class Scheduler:
         :param tasks: All tasks that are new or have changed inputs.
         :return: List of composed tasks to expand. If empty the optimization should be called.
         """
-        self.tasks.update({ t.id: t for t in tasks})
+        finished = [t for t in tasks if isinstance(t, task_mod.Composed) and t.is_expanded()
+                    and t.status < task_mod.Status.submitted and self.is_finished(t)]
+        for t in finished:
+            # Result provided by the expansion itself, e.g. lazy, its result child depends on the task.
+            for dep_task in self._set_finished(t):
+                self.ready_queue_push(dep_task)
+            self._pop_task(t.id)
+        tasks = [t for t in tasks if t.status < task_mod.Status.finished]
+        for t in tasks:
+            self._add_task(t)
+        self._new_tasks.extend(tasks)
+        for t in tasks:
+            if isinstance(t, task_mod.Composed) and t.is_expanded():
+                if t.id not in self._waiting:
+                    self._set_waiting(t)
+            elif self._waits_for_expanded(t):
+                # New output of the composed tasks expanded before.
+                self._waiting.add(t.id)
+        if self.release_intermediates:
+            for t in tasks:
+                producers = self._producers.setdefault(t.result_hash, [])
+                if not any(p is t for p in producers):
+                    producers.append(t)
+
+    def _set_waiting(self, composed):
+        """
+        Mark the expanded composed task and its outputs waiting only for the expanded composed tasks.
+        """
+        self._waiting.add(composed.id)
+        for out in composed.outputs:
+            if out.id in self.tasks and self._waits_for_expanded(out):
+                self._waiting.add(out.id)
+
+    def _waits_for_expanded(self, task):
+        """
+        True if some dependencies of the task are expanded composed tasks and the others are finished.
+        """
+        waits = False
+        # Composed tasks are expanded in the order of creation, the reversed order
+        # stops early for outputs with many dependencies, e.g. result of ForEach.
+        for dep in reversed(task.dependencies):
+            if dep.id in self._waiting:
+                waits = True
+            elif not self.is_finished(dep):
+                return False
+        return waits
 
     def ready_queue_push(self, task):
+        if task.status >= task_mod.Status.submitted or task in self._ready_queue:
+            return
         if task.is_ready(self.cache):
-            heapq.heappush(self._ready_queue, task)
+            self._ready_queue.push(task, task.priority)
 
     def log_submit(self, task):
         pass
@@ -226,74 +603,230 @@ class Scheduler:
             # new_finished = list(itertools.chain.from_iterable(res_finished_iter))
             new_finished = []
             for task in resource.get_finished():
-                scheduled_tasks = self._task_map[task.result_hash]
+                # Tasks of the evaluation before the last 'reset' are not mapped.
+                scheduled_tasks = self._task_map.pop(task.result_hash, [])
                 new_finished.extend(scheduled_tasks)
-                scheduled_tasks.clear()
 
             for task in new_finished:
-                for dep_task in task.outputs:
-                     self.ready_queue_push(dep_task)
+                for dep_task in self._set_finished(task):
+                    self.ready_queue_push(dep_task)
             finished.extend(new_finished)
         return finished
 
+    def _set_finished(self, task):
+        """
+        Mark the task finished, decrement pending dependencies of its outputs.
+        :return: Outputs with no pending dependencies left.
+        """
+        if task.status == task_mod.Status.finished:
+            return []
+        task.status = task_mod.Status.finished
+        self._finished_event.set()
+        if self.release_intermediates:
+            self._release_inputs(task)
+        if self.on_finished is not None:
+            self.on_finished(task)
+        unblocked = []
+        for out in task.outputs:
+            if isinstance(out, task_mod.Composed) and out.is_expanded():
+                # The expanded task depends just on its result child.
+                if out.childs['__result__'] is not task:
+                    continue
+                out.n_pending = 0
+            else:
+                out.n_pending -= 1
+            if out.n_pending == 0:
+                unblocked.append(out)
+        return unblocked
+
+    def _release_inputs(self, task):
+        """
+        Release results of the task inputs that have all consumers finished.
+        """
+        for producer in task.dependencies:
+            result_hash = producer.result_hash
+            if result_hash not in self._producers:
+                continue
+            all_consumed = all(
+                consumer.status == task_mod.Status.finished and
+                not getattr(consumer.action, 'captures_inputs', False)
+                for same_task in self._producers[result_hash] for consumer in same_task.outputs)
+            if all_consumed:
+                del self._producers[result_hash]
+                self.cache.release(result_hash)
+
 
     def update(self):
         """
         Update resources, collect finished tasks, submit new ready tasks.
         Should be called approximately every 'call_period' seconds.
         """
+        self._finished_event.clear()
         finished = self._collect_finished()
+        postponed = []
+        # Ready tasks of the full resources.
         while self._ready_queue:
-            task = heapq.heappop(self._ready_queue)
-            if task.id in self.tasks:   # deal with duplicate entrieas in the queue
-                if not self.is_finished(task):
-                    assert task.is_ready(self.cache)
-                    # TODO: remove _task_map and use just task hashes for task referencing
-                    # automaticaly eliminating duplicities in the evaluation DAG
-                    # However should be accompanied by the checking the database in order to allow memoizing only
-                    # short term history of tasks.
-                    key = task.result_hash
-                    if key in self._task_map:
-                        # We skip evaluation of all tasks with the same result hash.
-                        self._task_map[key].append(task)
-                    else:
-                        self._task_map[key] = [task]
-                        self.resources[task.resource_id].submit(task.task)
-                        value = self.cache.value(task.id)
-                        self.log.task_submit(task, value)
-                del self.tasks[task.id]
+            task = self._ready_queue.pop()
+            if not self.is_finished(task):
+                assert task.is_ready(self.cache)
+                # TODO: remove _task_map and use just task hashes for task referencing
+                # automaticaly eliminating duplicities in the evaluation DAG
+                # However should be accompanied by the checking the database in order to allow memoizing only
+                # short term history of tasks.
+                key = task.result_hash
+                resource = self.resources[task.resource_id]
+                if key in self._task_map:
+                    # We skip evaluation of all tasks with the same result hash.
+                    self._task_map[key].append(task)
+                    task.status = task_mod.Status.submitted
+                elif task.fused:
+                    task.status = task_mod.Status.submitted
+                    finished.extend(self._evaluate_fused(task))
+                elif resource.is_full:
+                    postponed.append(task)
+                    if all(res.is_full for res in self.resources):
+                        # Remaining tasks wait in the queue, no repeated pops while the resources are busy.
+                        break
+                    continue
+                else:
+                    self._task_map[key] = [task]
+                    resource.submit(task.task)
+                    value = self.cache.value(task.id)
+                    self.log.task_submit(task, value)
+                    task.status = task_mod.Status.submitted
+            else:
+                for dep_task in self._set_finished(task):
+                    self.ready_queue_push(dep_task)
+            self._pop_task(task.id)
+            self._waiting.discard(task.id)
+        for task in postponed:
+            self._ready_queue.push(task, task.priority)
+        return finished
+
+    def _evaluate_fused(self, task):
+        """
+        Evaluate the ready fused task directly, continue with its fused outputs that become ready.
+        So a chain of cheap tasks is evaluated in a single update, without the resources and
+        the ready queue. Results are cached under the hashes of the individual tasks as usual.
+        :return: List of finished tasks.
+        """
+        finished = []
+        chain = [task]
+        while chain:
+            task = chain.pop()
+            self._fusion_resource.submit(task.task)
+            self._fusion_resource.get_finished()
+            self.log.task_submit(task, self.cache.value(task.id))
+            finished.append(task)
+            for out in self._set_finished(task):
+                if (out.fused and out.status < task_mod.Status.submitted and out not in self._ready_queue
+                        and out.result_hash not in self._task_map and out.is_ready(self.cache)):
+                    out.status = task_mod.Status.submitted
+                    self._pop_task(out.id)
+                    self._waiting.discard(out.id)
+                    chain.append(out)
+                else:
+                    self.ready_queue_push(out)
         return finished
 
+    def _notify(self):
+        self._finished_event.set()
+        wakeup = self._wakeup
+        if wakeup is not None:
+            wakeup()
+
+    def wait(self):
+        """
+        Block until a task is finished since the last update or the 'wait_timeout' expires.
+        Called by the evaluation loop when there is nothing to expand or submit.
+        """
+        self._finished_event.wait(self.wait_timeout)
+
+    async def wait_async(self):
+        """
+        Coroutine version of 'wait', the event loop is not blocked.
+        """
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        self._wakeup = lambda: loop.call_soon_threadsafe(event.set)
+        try:
+            if not self._finished_event.is_set():
+                await asyncio.wait_for(event.wait(), self.wait_timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._wakeup = None
+
     def optimize(self):
         """
-        Perform CPM on the DAG of non-submitted tasks.
+        Perform CPM on the DAG of non-submitted tasks incrementally, only the tasks appended
+        since the last call and the tasks affected by them are visited.
         Assign start_times and priorities according to the slack time.
         Assume just a single resource.
+
+        The new tasks get the earliest start time after their dependencies (forward pass)
+        and the tail time, i.e. the longest path to the DAG end (backward pass). Appended tasks are
+        new dependencies of the older tasks, so only the tail times of the older dependencies
+        of the new tasks can grow, these are propagated backward until no change.
+        The start times are not propagated forward, the ready tasks have all dependencies
+        finished, so their slack is determined just by the tail time.
+        Finished tasks have zero evaluation time.
         :return:
         """
-        # perform topological sort
+        new_tasks = {id(task): task for task in self._new_tasks}
+        self._new_tasks = []
+        topology_sort = []
+
         def predecessors(task):
             if self.is_finished(task):
                 return []
-            else:
-                max_end_time = 0
-                for pre in task.inputs:
-                    max_end_time = max(max_end_time, pre.start_time + pre.eval_time)
-                task.start_time = max_end_time
-            return task.inputs
+            return [pre for pre in task.dependencies if id(pre) in new_tasks]
+
+        def end_time(task):
+            if self.is_finished(task):
+                return 0
+            return task.start_time + task.eval_time
 
         def post_visit(task):
+            if not self.is_finished(task):
+                task.start_time = max((end_time(pre) for pre in task.dependencies), default=0)
             kind = task.task.action.action_kind
             kind_list = self._resource_map[kind]
             assert kind_list, 'There are no resource capable of run "{}".'.format(kind)
             task.resource_id = kind_list[0]
+            if task.fused and not task.action.fusible and isinstance(self.resources[task.resource_id], _PoolResource):
+                # Actions fused just due to the measured time are kept on the pool resources,
+                # e.g. for the process isolation.
+                task.fused = False
+            topology_sort.append(task)
 
+        dfs.DFS(neighbours=predecessors,
+                postvisit=post_visit).run(new_tasks.values())
+
+        update_tail = []
+        for task in reversed(topology_sort):
+            self._set_tail_time(task)
+            update_tail.extend(pre for pre in task.dependencies if id(pre) not in new_tasks)
+        while update_tail:
+            task = update_tail.pop()
+            if self._set_tail_time(task):
+                update_tail.extend(task.dependencies)
+
+        for task in topology_sort:
             self.ready_queue_push(task)
-            self._topology_sort.append(task)
 
-
-        dfs.DFS(neighbours=predecessors,
-                postvisit=post_visit).run(self.tasks.values())
+    def _set_tail_time(self, task):
+        """
+        Update the tail time of the task from its outputs, return True if it has grown.
+        """
+        if self.is_finished(task):
+            return False
+        tail_time = task.eval_time + max((out.tail_time for out in task.outputs), default=0)
+        if tail_time > task.tail_time:
+            task.tail_time = tail_time
+            self._ready_queue.update(task, task.priority)
+            return True
+        return False
 
 
 
@@ -355,32 +888,92 @@ class Evaluation:
     def __init__(self,
                  scheduler: Scheduler = None,
                  workspace: str = ".",
-                 plot_expansion: bool = False
+                 plot_expansion: bool = False,
+                 resources: List[Resource] = None,
+                 cache: ResultCache = None,
+                 release_intermediates: bool = False,
+                 hash_backend: str = None,
+                 time_model: ExecutionTimeModel = None,
+                 fusion_time: Optional[float] = 1e-4,
+                 persistent: bool = False
                  ):
         """
         Create object for evaluation of the workflow 'analysis' with no parameters.
         Use 'make_analysis' to substitute arguments to arbitrary action.
 
         :param analysis: an action without inputs
+        :param resources: Resources for the default scheduler, a single Resource by default.
+            Resources without a cache get the cache of the evaluation.
+        :param cache: Result cache for the default scheduler, e.g. DiskResultCache to reuse
+            results of previous evaluations. New ResultCache by default.
+        :param release_intermediates: Release intermediate results from the cache as soon as all tasks
+            consuming them are finished. Only the final result and values pinned in the cache are kept,
+            so results of the child tasks may not be available through TaskResult.child.
+        :param hash_backend: Name of the hash function (see data.hash_backends) used during the evaluation,
+            current data.default_hash by default.
+        :param time_model: Model of the action evaluation times used for the scheduling, updated by
+            the measured times. New model by default, see 'persistent'.
+        :param fusion_time: Tasks of the actions with the measured evaluation time under this limit [seconds]
+            and of the 'fusible' actions are evaluated directly by the scheduler, without a round trip
+            through the resources. None to switch off the task fusion.
+        :param persistent: Keep the default time model and the memo of the input file hashes
+            in the workspace files '.visip_time_model.json' and '.visip_file_hashes.json',
+            so that they are reused by later evaluations. In memory only by default.
         """
         self.log = EvalLogger()
-        self.cache = ResultCache()
 
         if scheduler is None:
-            scheduler = Scheduler([ Resource(self.cache) ], self.cache)
+            if cache is None:
+                cache = ResultCache()
+            self.cache = cache
+            if resources is None:
+                resources = [Resource()]
+            for res in resources:
+                if res.cache is None:
+                    res.cache = self.cache
+            scheduler = Scheduler(resources, self.cache)
+        else:
+            assert resources is None and cache is None, "Resources and cache are given by the scheduler."
+            self.cache = scheduler.cache
         self.scheduler = scheduler
         self.scheduler.log = self.log
+        self.scheduler.on_finished = self._wake_blocked
+        if release_intermediates:
+            self.scheduler.release_intermediates = True
+        if isinstance(self.cache, BoundedResultCache):
+            self.cache.needed_hashes = self.scheduler.needed_hashes
         self.workspace = workspace
         self.plot_expansion = plot_expansion
+        self.hash_backend = hash_backend
         #self.plot_expansion = True
         self.final_task = None
+        # The root task of the evaluated analysis, the first one in the case of 'execute_many'.
+        self.final_tasks = []
+        # Root tasks of all evaluated analyses.
 
         self.composed_id = 0
         # Auxiliary ID of composed tasks to break ties
         self.queue = []
         # Priority queue of the composed tasks to expand. Tasks are expanded until the task DAG is not
         # complete or number of unresolved tasks is smaller then given limit.
+        self.task_table: Dict[bytes, task_mod.TaskSchedule] = {}
+        # Tasks by the result hash. Equal sub-computations in different branches of the execution tree
+        # share a single task.
+        self._blocked: Dict[bytes, List[task_mod.Composed]] = {}
+        # Composed tasks that can not be expanded yet, by the result hashes of their unfinished inputs.
+        # Enqueued again when one of these inputs is finished.
+        self._blocked_tasks: Dict[int, task_mod.Composed] = {}
+        # The blocked tasks by their Python id.
         os.makedirs(workspace, exist_ok=True)
+        def workspace_file(name):
+            return os.path.join(workspace, name) if persistent else None
+        self.file_hash_index = data.FileHashIndex(workspace_file(".visip_file_hashes.json"))
+        # Memo of the input file hashes, optionally persistent in the workspace.
+        if time_model is None:
+            time_model = ExecutionTimeModel(workspace_file(".visip_time_model.json"))
+        self.time_model = time_model
+        # Learned evaluation times of the actions.
+        self.fusion_time = fusion_time
 
         self.force_finish = False
         # Used to force end of evaluation after an error.
@@ -388,7 +981,29 @@ class Evaluation:
         # List of tasks finished with error.
         self.expansion_iter = 0
         # Expansion iteration.
+        self._stream_iterations = False
+        # Collect the loop state tasks, set by 'stream'.
+        self.iterations = []
+        # Tasks of the loop states not yielded by 'stream' yet.
 
+    def reset(self):
+        """
+        Reset the state of the evaluation in order to reuse the Evaluation object.
+        The result cache, the file hash index and the time model are kept, so the tasks
+        evaluated previously are not evaluated again. Called by every 'execute'.
+        """
+        self.final_task = None
+        self.final_tasks = []
+        self.composed_id = 0
+        self.queue = []
+        self.task_table = {}
+        self._blocked = {}
+        self._blocked_tasks = {}
+        self.force_finish = False
+        self.error_tasks = []
+        self.expansion_iter = 0
+        self.iterations = []
+        self.scheduler.reset()
 
     def tasks_update(self, tasks):
         for t in tasks:
@@ -398,13 +1013,35 @@ class Evaluation:
     def estimate_task_eval_time(self, task):
         """
         Estimate the task evaluation time using the action and result_db.
+        An expanded composed task just passes the result of its child.
         :param task:
         :return:
         """
         if self.scheduler.is_finished(task):
             task.eval_time = task.end_time - task.start_time
+        elif isinstance(task, task_mod.Composed):
+            task.time_estimate = self.time_model.predict(task.action)
+            task.eval_time = 0 if task.is_expanded() else task.time_estimate
         else:
-            task.time_estimate = 1
+            task.eval_time = self.time_model.predict(task.action)
+            if self.fusion_time is not None:
+                task.fused = task.action.fusible or (
+                    task.eval_time < self.fusion_time and self.time_model.n_samples(task.action) > 0)
+
+    def record_eval_times(self, finished):
+        """
+        Update the time model by the finished tasks. Composed tasks are measured from the expansion,
+        the root tasks binding the arguments are specific to the evaluation, so they are skipped.
+        """
+        now = time.perf_counter()
+        for task in finished:
+            if task.parent is None:
+                continue
+            if isinstance(task, task_mod.Composed):
+                if task.expand_time is not None:
+                    self.time_model.record(task.action, now - task.expand_time)
+            elif task.task.wall_time is not None:
+                self.time_model.record(task.action, task.task.wall_time)
 
     def validate_connections(self, action):
         """
@@ -450,6 +1087,77 @@ class Evaluation:
         analysis = self._make_analysis(action, args, kwargs)
         return self.execute(analysis)
 
+    def run_many(self, action, arg_list: List[Union[tuple, list, dict]]) -> List[TaskResult]:
+        """
+        Evaluate the action for every item of 'arg_list', e.g. a parameter study.
+        Item is a tuple (or list) of positional arguments or a dict of keyword arguments.
+        All analyses are expanded into the single task DAG, so the common tasks (same result hash)
+        are evaluated once and the independent tasks of different analyses can run in parallel.
+        :return: TaskResult for every item of 'arg_list', in the same order.
+        """
+        analyses = []
+        for item in arg_list:
+            if isinstance(item, dict):
+                analyses.append(self._make_analysis(action, [], item))
+            else:
+                analyses.append(self._make_analysis(action, item, {}))
+        return self.execute_many(analyses)
+
+    async def run_async(self, action, *args, **kwargs) -> TaskResult:
+        """
+        Coroutine version of 'run', the evaluation runs in the calling event loop.
+        Use AsyncResource to evaluate the `system` and coroutine actions concurrently without threads,
+        the default Resource evaluates them one by one, blocking the event loop.
+        Note that the working directory is changed to the workspace during the evaluation
+        as in the case of 'run'.
+        :return:
+        """
+        analysis = self._make_analysis(action, args, kwargs)
+        return await self.execute_async(analysis)
+
+    def stream(self, action, *args, **kwargs):
+        """
+        Evaluate given action with given arguments, yield the state of every loop iteration
+        as soon as it is computed. Loops are composed actions with the 'iteration_state' attribute,
+        e.g. While, the last state of a loop is its result.
+        States of nested or parallel loops are yielded in the order of their completion.
+        The evaluation is stopped when the generator is closed, e.g. by 'break' in the consumer loop.
+        The working directory is changed to the workspace only between the yields.
+        """
+        analysis = self._make_analysis(action, args, kwargs)
+        self._stream_iterations = True
+        try:
+            with self._hash_backend(), data.use_file_hash_index(self.file_hash_index):
+                self._start([analysis])
+            while not self.force_finish:
+                with self._hash_backend(), data.use_file_hash_index(self.file_hash_index), \
+                        tools.change_cwd(self.workspace):
+                    idle = self._step()
+                states = self._finished_iterations()
+                yield from states
+                if idle and not states:
+                    self.scheduler.wait()
+        finally:
+            self._stream_iterations = False
+            self.force_finish = True
+            self.time_model.save()
+
+    def _finished_iterations(self):
+        finished = []
+        pending = []
+        for state_task in self.iterations:
+            if state_task.status == task_mod.Status.finished:
+                finished.append(self.cache.value(state_task.result_hash))
+            else:
+                pending.append(state_task)
+        self.iterations = pending
+        return finished
+
+    def _hash_backend(self):
+        if self.hash_backend is None:
+            return contextlib.nullcontext()
+        return data.hash_backend(self.hash_backend)
+
     def execute(self, analysis) -> task_mod.TaskSchedule:
         """
         Execute the workflow.
@@ -457,33 +1165,89 @@ class Evaluation:
                                 TODO: should be part of the Scheduler config
         workspace -
 
+        The Evaluation object can be reused, tasks with results in the cache are not evaluated again.
         :return:
         """
-        #TODO: Reinit scheduler and own structures to allow reuse of the Evaluation object.
-        task_binding = tools.TaskBinding('__root__', analysis, ([],{}), [])
-        self.final_task = task_mod.TaskSchedule._create_task(None, task_binding)
-        self.enqueue(self.final_task)
-        # init scheduler
-        self.tasks_update([self.final_task])
+        return self.execute_many([analysis])[0]
 
-
-        with tools.change_cwd(self.workspace):
-            # print("CWD: ", os.getcwd())
-            invalid_connections = self.validate_connections(self.final_task.action)
+    def execute_many(self, analyses: List[_Workflow]) -> List[TaskResult]:
+        """
+        Execute several workflows without parameters in the common task DAG.
+        :return: List of results in the order of 'analyses'.
+        """
+        with self._hash_backend(), data.use_file_hash_index(self.file_hash_index):
+            try:
+                self._start(analyses)
+                with tools.change_cwd(self.workspace):
+                    while not self.force_finish:
+                        if self._step():
+                            self.scheduler.wait()
+                return [TaskResult(task, self.cache) for task in self.final_tasks]
+            finally:
+                self.time_model.save()
+
+    async def execute_async(self, analysis) -> TaskResult:
+        """
+        Coroutine version of 'execute', awaits the resources instead of blocking.
+        The working directory, the hash backend and the file hash index are process global,
+        so they are set just during the synchronous steps, not while other coroutines run.
+        Actions evaluated out of the steps (coroutines, pool resources) should not depend
+        on the working directory.
+        """
+        try:
+            with self._hash_backend(), data.use_file_hash_index(self.file_hash_index):
+                self._start([analysis])
+            while not self.force_finish:
+                with self._hash_backend(), data.use_file_hash_index(self.file_hash_index), \
+                        tools.change_cwd(self.workspace):
+                    idle = self._step()
+                if idle:
+                    await self.scheduler.wait_async()
+            return TaskResult(self.final_task, self.cache)
+        finally:
+            self.time_model.save()
+
+    def _start(self, analyses):
+        self.reset()
+        for analysis in analyses:
+            invalid_connections = self.validate_connections(analysis)
             if invalid_connections:
                 raise Exception(invalid_connections)
-            self.expansion_iter = 0
-            while not self.force_finish:
-                schedule = self.expand_tasks()  # returns list of expanded atomic tasks to schedule
-                if self.plot_expansion:
-                    self._plot_task_graph(self.expansion_iter)
-                self.tasks_update(schedule)     # pass the list to the scheduler, update its hash -> task dictionary
-                self.scheduler.optimize()       # currently performs full CPM algorithm
-                self.scheduler.update()
-                if self.scheduler.n_assigned_tasks == 0:
-                    self.force_finish = True
-                self.expansion_iter += 1
-        return TaskResult(self.final_task, self.cache)
+
+        self.final_tasks = []
+        new_tasks = []
+        added = set()
+        # IDs of the root tasks in 'new_tasks', equal analyses share a single root task.
+        for analysis in analyses:
+            task_binding = tools.TaskBinding('__root__', analysis, ([],{}), [])
+            final_task = task_mod.TaskSchedule._create_task(None, task_binding)
+            final_task = self.task_table.setdefault(final_task.result_hash, final_task)
+            if id(final_task) not in added:
+                self.cache.pin(final_task.result_hash)
+                self.enqueue(final_task)
+                new_tasks.append(final_task)
+                added.add(id(final_task))
+            self.final_tasks.append(final_task)
+        self.final_task = self.final_tasks[0]
+        # init scheduler
+        self.tasks_update(new_tasks)
+
+    def _step(self) -> bool:
+        """
+        Single iteration of the evaluation loop.
+        :return: True if there is nothing new to expand or submit until some task is finished.
+        """
+        schedule = self.expand_tasks()  # returns list of expanded atomic tasks to schedule
+        if self.plot_expansion:
+            self._plot_task_graph(self.expansion_iter)
+        self.tasks_update(schedule)     # pass the list to the scheduler, update its hash -> task dictionary
+        self.scheduler.optimize()       # incremental CPM of the new tasks
+        self.record_eval_times(self.scheduler.update())
+        self.expansion_iter += 1
+        if self.scheduler.n_assigned_tasks == 0 and self.scheduler.n_running_tasks == 0:
+            self.force_finish = True
+            return False
+        return not schedule
 
 
 
@@ -492,6 +1256,36 @@ class Evaluation:
         heapq.heappush(self.queue, (self.composed_id, task.time_estimate, task))
         self.composed_id += 1
 
+    def _block(self, task: task_mod.Composed) -> bool:
+        """
+        Register the composed task that can not be expanded to its unfinished inputs.
+        :return: False if all inputs are finished.
+        """
+        waits_for = [input.result_hash for input in task.inputs if not self.cache.is_finished(input.result_hash)]
+        for result_hash in waits_for:
+            self._blocked.setdefault(result_hash, []).append(task)
+        if waits_for:
+            self._blocked_tasks[id(task)] = task
+        return bool(waits_for)
+
+    def _wake_blocked(self, task: task_mod.TaskSchedule):
+        """
+        Enqueue the blocked composed tasks waiting for the result of the finished task.
+        A task waiting for more inputs is enqueued on the first of them.
+        """
+        for blocked in self._blocked.pop(task.result_hash, ()):
+            if self._blocked_tasks.pop(id(blocked), None) is not None:
+                self.enqueue(blocked)
+
+    def _add_iteration(self, task: task_mod.Composed):
+        """
+        Collect the state of the expanded loop task for the 'stream'.
+        """
+        state_param = getattr(task.action, 'iteration_state', None)
+        if state_param is not None:
+            i_state = [param.name for param in task.action.parameters].index(state_param)
+            self.iterations.append(task.inputs[i_state])
+
 
     def expand_tasks(self):
         """
@@ -503,18 +1297,27 @@ class Evaluation:
         schedule = []
         postpone_expand = []
         # List of composed tasks with postponed expansion, have to be re-enqueued.
+        # Only the tasks blocked with all inputs finished, the others wait for their inputs, see '_block'.
 
-        while self.queue and not self.force_finish and self.scheduler.can_expand():
-            composed_id, time, composed_task = heapq.heappop(self.queue)
-            task_dict = composed_task.expand(self.cache)
+        idle = self.scheduler.is_idle()
+        # Over the limit the idle scheduler would wait for ever, e.g. for unexpanded If tasks.
+        while self.queue and not self.force_finish and (self.scheduler.can_expand() or idle and not schedule):
+            composed_id, time_estimate, composed_task = heapq.heappop(self.queue)
+            composed_task.expand_time = time.perf_counter()
+            task_dict = composed_task.expand(self.cache, self.task_table)
 
             if task_dict is None:
-                # Can not expand yet, return back into queue
-                postpone_expand.append(composed_task)
+                # Can not expand yet, wait for the inputs or return back into queue.
+                if not self._block(composed_task):
+                    postpone_expand.append(composed_task)
             else:
                 self.log.task_expand(composed_task, task_dict)
+                if self._stream_iterations:
+                    self._add_iteration(composed_task)
                 # print("Expanded: ", task_dict)
-                for task in task_dict.values():
+                # Interned tasks of other composed tasks are already scheduled.
+                new_tasks = {id(task): task for task in task_dict.values() if task.parent is composed_task}
+                for task in new_tasks.values():
                     if isinstance(task, task_mod.Composed):
                         self.enqueue(task)
                     schedule.append(task)
@@ -556,7 +1359,7 @@ class Evaluation:
             g.node(task.id.hex()[:6], label=node_label, color=color, shape='box', style=style)
 
         dfs.DFS(neighbours=predecessors,
-                previsit=previsit).run([self.final_task])
+                previsit=previsit).run(self.final_tasks)
         return g
 
 
@@ -601,7 +1404,7 @@ class Evaluation:
             g.add_task_node(task.id.hex()[:6], node_label, color, style)
 
         dfs.DFS(neighbours=predecessors,
-                previsit=previsit).run([self.final_task])
+                previsit=previsit).run(self.final_tasks)
         return g
 
 
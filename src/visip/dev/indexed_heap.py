@@ -0,0 +1,79 @@
+"""
+Binary heap of items with priorities that can be changed while the item is in the heap.
+Used by the Scheduler for the queue of the ready tasks, the priorities of the queued
+tasks grow as the task DAG is expanded.
+"""
+import heapq
+from typing import *
+
+
+class IndexedHeap:
+    """
+    Min heap of items (compared by identity), each item is present at most once.
+    Items with equal priority are popped in the order of insertion.
+
+    Built on 'heapq', the priority update invalidates the current entry of the item
+    and pushes a new one, invalid entries are dropped when they reach the top of the heap.
+    """
+    def __init__(self):
+        self._heap: List[list] = []
+        # Heap entries: [priority, insertion counter, item], item is None for the invalid entries.
+        self._entries: Dict[int, list] = {}
+        # Maps id of the item to its valid entry.
+        self._n_pushed = 0
+        # Number of pushes, breaks priority ties in the FIFO manner.
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __bool__(self):
+        return bool(self._entries)
+
+    def __contains__(self, item):
+        return id(item) in self._entries
+
+    def push(self, item, priority):
+        """
+        Insert the item. Item already present in the heap is not inserted again.
+        """
+        if id(item) in self._entries:
+            return
+        self._push_entry(item, priority)
+
+    def pop(self):
+        """
+        Remove and return the item with the smallest priority.
+        """
+        self._drop_invalid()
+        item = heapq.heappop(self._heap)[2]
+        del self._entries[id(item)]
+        return item
+
+    def peek(self):
+        """
+        Return the item with the smallest priority without removing it.
+        """
+        self._drop_invalid()
+        return self._heap[0][2]
+
+    def update(self, item, priority):
+        """
+        Change the priority of the item in the heap, do nothing for other items.
+        The updated item is ordered as the last inserted among the items of equal priority.
+        """
+        entry = self._entries.get(id(item), None)
+        if entry is None or entry[0] == priority:
+            return
+        entry[2] = None
+        self._push_entry(item, priority)
+
+    def _push_entry(self, item, priority):
+        entry = [priority, self._n_pushed, item]
+        self._n_pushed += 1
+        self._entries[id(item)] = entry
+        heapq.heappush(self._heap, entry)
+
+    def _drop_invalid(self):
+        heap = self._heap
+        while heap[0][2] is None:
+            heapq.heappop(heap)
@@ -48,7 +48,8 @@ from ..dev.parameters import Parameters, ActionParameter
 from . import dtype
 from ..code.dummy import DummyAction, Dummy, DummyWorkflow
 from ..dev import tools
-from ..action.constructor import Pass
+from ..action.constructor import Pass, A_list
+from ..action.converter import GetItem
 
 
 
@@ -64,6 +65,10 @@ class MetaAction(base.ActionBase):
     ... producing an action can not be always implemented as an expansion. We need a separate mechanism to process
     actions operating with actions locally or we have to simplify the core ( possibly in truly functional manner).
     """
+    captures_inputs = False
+    # True for actions keeping references to their input tasks after they are finished (e.g. 'lazy'),
+    # the results of such inputs must not be released during the evaluation.
+
     def __init__(self, name):
         super().__init__(name)
         self.action_kind = base.ActionKind.Meta
@@ -158,14 +163,11 @@ class _Closure(MetaAction):
         # TODO: get callable type and check given arguments against signature
         # TODO: how to consistently reports errors at this stage
 
-    def action_hash(self):
+    def _make_action_hash(self):
         # TODO: test that the hash is the same as the direct call of the action.
-        task_hash = self._action.action_hash()
-        for task in self._args:
-            task_hash = data.hash(task.result_hash, previous=task_hash)
-        for task in self._kwargs.values():
-            task_hash = data.hash(task.result_hash, previous=task_hash)
-        return task_hash
+        input_hashes = [task.result_hash for task in self._args]
+        input_hashes.extend(task.result_hash for task in self._kwargs.values())
+        return data.hash_list(input_hashes, previous=self._action.action_hash())
 
     def __repr__(self):
         return f"Closure({self._action}; {[task.short_hash(task.id) for task in self._args]})"
@@ -213,6 +215,8 @@ class _Lazy(MetaAction):
     Binds arguments but do not call the action, just return resulting
     action remaining parameters.
     """
+    captures_inputs = True
+
     def __init__(self):
         """
         """
@@ -354,6 +358,113 @@ class _If(MetaAction):
             return None
 
 
+class _ForEach(MetaAction):
+    """
+    Apply the 'body' action to every item of the 'items' list.
+    The task is expanded to independent calls of the body in a single expansion step,
+    so the calls can be evaluated in parallel. The result is the list of the body results.
+    The items are read from the 'items' input by the GetItem tasks, so they need not to be
+    VISIP typed values and they are not hashed.
+    """
+    def __init__(self):
+        super().__init__("ForEach")
+        self._get_item = GetItem()
+        ReturnType = TypeVar('ReturnType')
+        params = []
+        params.append(
+            ActionParameter(name="body", p_type=Callable[..., ReturnType]))
+        params.append(
+            ActionParameter(name="items", p_type=dtype.List(dtype.Any)))
+        self._parameters = Parameters(params, dtype.List(dtype.Any))
+
+    def expand(self, task, task_creator, cache):
+        if all([cache.is_finished(i_task.result_hash) for i_task in task.inputs]):
+            action = self.dynamic_action(cache.value(task.inputs[0].result_hash))
+            items_task = task.inputs[1]
+            n_items = len(cache.value(items_task.result_hash))
+            childs = {}
+            body_tasks = []
+            for i in range(n_items):
+                index_task = task_creator(tools.TaskBinding(f"index_{i}", Value(i), ([], {}), []))
+                item_binding = tools.TaskBinding(f"item_{i}", self._get_item, ([0, 1], {}), [items_task, index_task])
+                item_task = task_creator(item_binding)
+                childs[f"index_{i}"] = index_task
+                body_binding = tools.TaskBinding(i, action, ([0], {}), [item_task])
+                body_task = task_creator(body_binding)
+                childs[f"item_{i}"] = item_task
+                childs[i] = body_task
+                body_tasks.append(body_task)
+            result_binding = tools.TaskBinding('__result__', A_list(), (list(range(len(body_tasks))), {}), body_tasks)
+            childs['__result__'] = task_creator(result_binding)
+            return childs
+        else:
+            return None
+
+
+class _While(MetaAction):
+    """
+    Native implementation of the While loop, see wrapped.While.
+    Expands to the call of the body on the previous state and to the _WhileNext task
+    deciding about the next iteration. That is three tasks per iteration instead of
+    the expansion through If, lazy and the closures.
+    """
+    iteration_state = 'previous'
+    # Parameter with the loop state, see Evaluation.stream.
+
+    def __init__(self):
+        super().__init__("While")
+        ReturnType = TypeVar('ReturnType')
+        params = []
+        params.append(
+            ActionParameter(name="body", p_type=Callable[..., ReturnType]))
+        params.append(
+            ActionParameter(name="previous", p_type=ReturnType))
+        self._parameters = Parameters(params, ReturnType)
+        self._next_action = _WhileNext(self)
+
+    def expand(self, task, task_creator, cache):
+        body_task, previous_task = task.inputs
+        if cache.is_finished(body_task.result_hash):
+            action = self.dynamic_action(cache.value(body_task.result_hash))
+            next_binding = tools.TaskBinding('next', action, ([0], {}), [previous_task])
+            next_task = task_creator(next_binding)
+            step_binding = tools.TaskBinding('__result__', self._next_action, ([0, 1, 2], {}),
+                                             [body_task, previous_task, next_task])
+            return {'next': next_task, '__result__': task_creator(step_binding)}
+        else:
+            return None
+
+
+class _WhileNext(MetaAction):
+    """
+    Continue the While loop with the 'next' state or finish with the 'previous' state if 'next' is None.
+    """
+    def __init__(self, while_action):
+        super().__init__("WhileNext")
+        ReturnType = TypeVar('ReturnType')
+        params = []
+        params.append(
+            ActionParameter(name="body", p_type=Callable[..., ReturnType]))
+        params.append(
+            ActionParameter(name="previous", p_type=ReturnType))
+        params.append(
+            ActionParameter(name="next", p_type=ReturnType))
+        self._parameters = Parameters(params, ReturnType)
+        self._while_action = while_action
+
+    def expand(self, task, task_creator, cache):
+        body_task, previous_task, next_task = task.inputs
+        if cache.is_finished(next_task.result_hash):
+            if cache.value(next_task.result_hash) is None:
+                task_binding = tools.TaskBinding('__result__', Pass(), ([0], {}), [previous_task])
+            else:
+                task_binding = tools.TaskBinding('__result__', self._while_action, ([0, 1], {}),
+                                                 [body_task, next_task])
+            return {'__result__': task_creator(task_binding)}
+        else:
+            return None
+
+
 
 
 
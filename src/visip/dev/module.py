@@ -524,6 +524,7 @@ class Module:
         TODO: sort of global index with usages of individual definitions.
         """
         action = self.get_action(name)
+        action.definition_modified()
         if isinstance(action, wf._Workflow):
             action.name = new_name
             #self._name_to_def[new_name] = action
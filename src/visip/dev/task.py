@@ -1,4 +1,5 @@
 import enum
+import sys
 from typing import *
 from . import data
 from . import base
@@ -27,28 +28,42 @@ class _TaskBase:
     - convert _TaskBase to TaskWork, use attribs
     - reduce number of properties
     """
+    __slots__ = ('action', 'input_hashes', 'id_args_pair', '_result_hash', '_evaluate_fn', 'wall_time')
+    # Millions of tasks are created for large evaluations.
 
     no_value = cache.ResultCache.NoValue
 
     def __init__(self, action: base.ActionBase,
-                 input_hashes: List['data.HashValue'], binding):
+                 input_hashes: List['data.HashValue'], binding, result_hash: bytes = None):
         self.action = action
         # Action (like function definition) of the task (like function call).
-        self.input_hashes = input_hashes
+        self.input_hashes = tuple(input_hashes)
         # hashes of input tasks
 
         self.id_args_pair = binding
         # binding of inputs to args and kwargs to be passed to actual evaluation function
 
-        self._result_hash = None
+        self._evaluate_fn = None
+        # Function accepting the input data and computing the result, 'action.evaluate' if None.
+
+        self.wall_time = None
+        # Measured evaluation time [seconds], set by the Resource.
+
+        if result_hash is None:
+            result_hash = self._lazy_hash()
+        self._result_hash = result_hash
         # Hash of the result
 
-        self.evaluate_fn = lambda x: None
-        # Returns a function accepting the input data and computing the result.
-        # e.g. action.evaluate
-        # TODO: set from TaskSchedule during construction
+    @property
+    def evaluate_fn(self):
+        fn = self._evaluate_fn
+        if fn is None:
+            return self.action.evaluate
+        return fn
 
-        self._result_hash = self._lazy_hash()
+    @evaluate_fn.setter
+    def evaluate_fn(self, fn):
+        self._evaluate_fn = fn
 
     def short_hash(self, h:bytes) -> str:
         return h.hex()[:4]
@@ -61,10 +76,14 @@ class _TaskBase:
         return self._result_hash
 
     def _lazy_hash(self):
-        task_hash = self.action.action_hash()
-        for input_hash in self.input_hashes:
-            task_hash = data.hash(input_hash, previous=task_hash)
-        return task_hash
+        return self.task_hash(self.action, self.input_hashes)
+
+    @staticmethod
+    def task_hash(action, input_hashes):
+        """
+        Hash of the result of the action applied to the inputs.
+        """
+        return data.hash_list(input_hashes, previous=action.action_hash())
 
     def inputs_to_args(self, data_inputs):
         return compose_arguments(self.id_args_pair, data_inputs)
@@ -74,10 +93,13 @@ class TaskSchedule:
     """
     Task used by Scheduler.
     """
-    def __init__(self, parent: 'Composed', task_binding: TaskBinding):
+    __slots__ = ('task', 'outputs', 'parent', 'child_id', 'status', 'resource_id',
+                 'start_time', 'tail_time', 'end_time', 'eval_time', 'fused', 'n_pending', '_inputs')
+
+    def __init__(self, parent: 'Composed', task_binding: TaskBinding, result_hash: bytes = None):
 
         input_hashes = [input.result_hash for input in task_binding.inputs]
-        self.task = _TaskBase(task_binding.action, input_hashes, task_binding.id_args_pair)
+        self.task = _TaskBase(task_binding.action, input_hashes, task_binding.id_args_pair, result_hash)
 
         # Input tasks for the action's arguments.
         self.outputs: List['TaskSchedule'] = []
@@ -85,7 +107,8 @@ class TaskSchedule:
 
         self.parent: Optional['Composed'] = parent
         # parent task
-        self.child_id = task_binding.child_name
+        child_id = task_binding.child_name
+        self.child_id = sys.intern(child_id) if isinstance(child_id, str) else child_id
         # name of current task within parent
         self.status = Status.none
         # Status of the task, possibly need not to be stored explicitly.
@@ -93,15 +116,24 @@ class TaskSchedule:
         self.resource_id = None
 
         self.start_time = -1
+        # Earliest start time, set by the Scheduler.
+        self.tail_time = 0
+        # Length of the longest path from the task start to the end of the DAG, set by the Scheduler.
         self.end_time = -1
         self.eval_time = 0
+        self.fused = False
+        # Cheap task evaluated directly by the Scheduler, set by the Evaluation.
 
         self._inputs = task_binding.inputs # reset in Workflow to its result, but we yet keep original in the task_binding
         # Connect to inputs.
         # TODO: remove dirrect referencing of the tasks use scheduler to refference through the result hashes
+        self.n_pending = 0
+        # Number of not finished dependencies, decremented by the Scheduler as they are finished.
         for input in task_binding.inputs:
             assert isinstance(input, TaskSchedule)
             input.outputs.append(self)
+            if input.status != Status.finished:
+                self.n_pending += 1
 
         self.set_evaluate_fn()  # set during construction
 
@@ -125,9 +157,20 @@ class TaskSchedule:
     def result_hash(self):
         return self.task.result_hash
 
+    @property
+    def dependencies(self) -> List['TaskSchedule']:
+        """
+        Tasks that have to be finished before the task can be evaluated.
+        """
+        return self._inputs
+
     @property
     def priority(self):
-        return 1
+        """
+        Smaller is more urgent. Ready tasks have all dependencies finished, so the slack is given
+        just by the tail time: tasks starting the longest remaining path (the critical path) first.
+        """
+        return -self.tail_time, self.start_time
 
     def short_hash(self, h):
         return self.task.short_hash(h)
@@ -144,16 +187,17 @@ class TaskSchedule:
         return self.priority < other.priority
 
     @staticmethod
-    def _create_task(parent_task, task_binding) -> 'TaskSchedule':
+    def _create_task(parent_task, task_binding, result_hash: bytes = None) -> 'TaskSchedule':
         """
         Create task from the given action and its input tasks.
+        :param result_hash: Result hash if already known.
         """
         task_type = task_binding.action.task_type
         if task_type == base.TaskType.Atomic:
-            child = Atomic(parent_task, task_binding)
+            child = Atomic(parent_task, task_binding, result_hash)
         elif task_type == base.TaskType.Composed:
             #task_binding.id_args_pair = ([0], {}) # for final auxiliary action
-            child = Composed(parent_task, task_binding)
+            child = Composed(parent_task, task_binding, result_hash)
         else:
             assert False
         return child
@@ -164,17 +208,16 @@ class TaskSchedule:
 
 
 class Atomic(TaskSchedule):
-
+    __slots__ = ()
 
     def is_ready(self, cache):
         """
         Update ready status, return
+        The dependencies are counted by 'n_pending', the 'cache' is not inspected.
         :return:
         """
-        if self.status < Status.ready:
-            is_ready = all([cache.is_finished(input_hash) for input_hash in self.task.input_hashes])
-            if is_ready:
-                self.status = Status.ready
+        if self.status < Status.ready and self.n_pending == 0:
+            self.status = Status.ready
         return self.status >= Status.ready
 
     def set_evaluate_fn(self):
@@ -183,7 +226,8 @@ class Atomic(TaskSchedule):
         TODO: should handle just status and possibly store the result
         since Resource may execute the task remotely.
         """
-        self.task.evaluate_fn = self.action.evaluate
+        # The default _TaskBase.evaluate_fn, i.e. self.action.evaluate.
+        pass
 
 
 class Composed(Atomic):
@@ -197,13 +241,16 @@ class Composed(Atomic):
     while its evaluation is empty so any task dependent on the expanded task depends on the result only indirectly
     through the expanded task. So the expansion doesn't break existing task dependencies.
     """
+    __slots__ = ('time_estimate', 'expand_time', 'childs')
 
-    def __init__(self, parent: 'Composed', task_binding: TaskBinding):
+    def __init__(self, parent: 'Composed', task_binding: TaskBinding, result_hash: bytes = None):
         # TODO: modify Task.create to accept input binding in form of id_args_pair
-        super().__init__(parent, task_binding)
+        super().__init__(parent, task_binding, result_hash)
 
         self.time_estimate = 0
-        # estimate of the start time, used as expansion priority
+        # Estimate of the evaluation time of the whole composed task, from the expansion to the result.
+        self.expand_time = None
+        # Time of the expansion [time.perf_counter()], set by the Evaluation.
         self.childs: Dict[Union[int, str], Atomic] = {}
         # map child_id to the child task, filled during expand.
 
@@ -235,15 +282,43 @@ class Composed(Atomic):
         """
 
     def is_expanded(self):
-        return self.childs is not None
+        # Successful expansion always produces at least the '__result__' child.
+        return bool(self.childs)
 
+    @property
+    def dependencies(self) -> List[TaskSchedule]:
+        """
+        After the expansion the composed task depends also on its result child.
+        """
+        result_task = self.childs.get('__result__', None)
+        if result_task is None:
+            return self._inputs
+        return [*self._inputs, result_task]
 
-    def create_child_task(self, task_binding: TaskBinding) -> TaskSchedule:
+
+    def create_child_task(self, task_binding: TaskBinding,
+                          task_table: Dict[bytes, TaskSchedule] = None, cache=None) -> TaskSchedule:
+        """
+        Create the child task. If 'task_table' is given, it is used to intern the tasks by the result hash,
+        i.e. an existing task with the same result hash is returned instead of a new one.
+        The existing task is a child of other composed task, its parent is not changed.
+        A finished task with the result released from the 'cache' is replaced by a new task.
+        """
         args, kwargs = task_binding.id_args_pair
         assert len(args) + len(kwargs) == len(task_binding.inputs)
-        return TaskSchedule._create_task(self, task_binding)
-
-    def expand(self, cache) -> Dict[str, TaskSchedule]:
+        if task_table is None:
+            return TaskSchedule._create_task(self, task_binding)
+        input_hashes = [input.result_hash for input in task_binding.inputs]
+        result_hash = _TaskBase.task_hash(task_binding.action, input_hashes)
+        task = task_table.get(result_hash, None)
+        released = (task is not None and task.status == Status.finished
+                    and cache is not None and not cache.is_finished(result_hash))
+        if task is None or released:
+            task = TaskSchedule._create_task(self, task_binding, result_hash)
+            task_table[result_hash] = task
+        return task
+
+    def expand(self, cache, task_table: Dict[bytes, TaskSchedule] = None) -> Dict[str, TaskSchedule]:
         """
         Composed task expansion.
 
@@ -264,23 +339,30 @@ class Composed(Atomic):
         - tasks dependent on the result - got through composed.outputs (must be pair task, input), must replace particular input hash
         - tasks dependent on the composed have invalid hash
 
+        :param task_table: Table of tasks for interning of the child tasks, see 'create_child_task'.
         """
         assert self.action.task_type is base.TaskType.Composed
         assert hasattr(self.action, 'expand')
 
         # Generate and connect body tasks.
-        childs = self.action.expand(self, self.create_child_task, cache)
+        if task_table is None:
+            task_creator = self.create_child_task
+        else:
+            task_creator = lambda task_binding: self.create_child_task(task_binding, task_table, cache)
+        childs = self.action.expand(self, task_creator, cache)
         if childs is not None:
             assert len(childs) > 0
             self.childs = childs #{task.child_id: task for task in childs}
             #self.childs.expand({})
             result_task = self.childs['__result__']
-            assert len(result_task.outputs) == 0
+            # Interned result task can have other outputs.
             result_task.outputs.append(self)
+            self.n_pending = 0 if result_task.status == Status.finished else 1
+            # The inputs are passed to the body, the expanded task waits just for the result.
             self.task.id_args_pair = ([0],{})
             #B: self._inputs = [result_task]
             #print(f"Expanding {self}#{self.short_hash(self.id)} depends on {result_task}#{self.short_hash(result_task.result_hash)}")
-            self.task.input_hashes = [result_task.result_hash]
+            self.task.input_hashes = (result_task.result_hash,)
             # After expansion the composed task is just a dummy task dependent on the previoous result.
             # This works with Workflow, see how it will work with other composed actions:
             # if, reduce (for, while)
@@ -292,8 +374,12 @@ class Composed(Atomic):
         Composed tasks use evaluate to finish expansion.
         """
         #TODO: move to calling point: assert len(self.inputs) == 1
-        def ff(*args):
-            return args[0]
-        #self.task.evaluate_fn = lambda *args: args[0]
-        self.task.evaluate_fn = ff
+        self.task.evaluate_fn = _pass_result
+
+
+def _pass_result(*args):
+    """
+    Evaluation of the expanded composed task, the result of its '__result__' child.
+    """
+    return args[0]
 
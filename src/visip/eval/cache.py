@@ -1,4 +1,12 @@
 from typing import *
+import os
+import sys
+import mmap
+import pickle
+import collections
+import attr
+
+from ..dev import data
 
 class ResultCache:
     """
@@ -13,6 +21,8 @@ class ResultCache:
 
     def __init__(self):
         self.cache: Dict[bytes, Any] = {}
+        self.pinned: Set[bytes] = set()
+        # Hashes of values that are never released.
 
     def value(self, hash: bytes) -> Any:
         return self.cache.get(hash, ResultCache.NoValue)
@@ -21,4 +31,232 @@ class ResultCache:
         self.cache[hash] = value
 
     def is_finished(self, hash_int:int) -> bool:
-        return self.value(hash_int) is not ResultCache.NoValue
\ No newline at end of file
+        return self.value(hash_int) is not ResultCache.NoValue
+
+    def pin(self, hash: bytes):
+        """
+        Protect the value from the release.
+        """
+        self.pinned.add(hash)
+
+    def release(self, hash: bytes):
+        """
+        Free the in memory value that is no more needed for the evaluation.
+        Pinned values are kept.
+        """
+        if hash not in self.pinned:
+            self.cache.pop(hash, None)
+
+
+class DiskResultCache(ResultCache):
+    """
+    Permanent result cache, values are stored in a content addressed directory:
+        <cache_dir>/<first two hex digits of the hash>/<rest of the hash>
+    Only the set of stored hashes is kept in the memory. Files larger then 'mmap_threshold' are
+    memory mapped for deserialization, the NumPy arrays are then read only views into the map.
+    Values that can not be serialized (e.g. closures and actions produced by the meta actions)
+    are kept in the memory only.
+    """
+    def __init__(self, cache_dir: str, mmap_threshold: int = 1 << 20):
+        """
+        :param cache_dir: Directory of the cache, created if not exists. Existing values are reused.
+        :param mmap_threshold: Minimal file size [bytes] to use memory mapping for reading.
+        """
+        super().__init__()
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.mmap_threshold = mmap_threshold
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index: Set[bytes] = set()
+        # Hashes of the values stored on the disk.
+        self._load_index()
+
+    def _load_index(self):
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if len(prefix) != 2 or not os.path.isdir(prefix_dir):
+                continue
+            for suffix in os.listdir(prefix_dir):
+                try:
+                    self._index.add(bytes.fromhex(prefix + suffix))
+                except ValueError:
+                    # temporary or foreign files
+                    pass
+
+    def _path(self, hash: bytes) -> str:
+        hex_hash = hash.hex()
+        return os.path.join(self.cache_dir, hex_hash[:2], hex_hash[2:])
+
+    def value(self, hash: bytes) -> Any:
+        if hash not in self._index:
+            return super().value(hash)
+        path = self._path(hash)
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < self.mmap_threshold:
+                return data.deserialize(f.read())
+            # The map is kept open by the views of the loaded arrays.
+            stream = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return data.deserialize(stream)
+
+    def insert(self, hash, value):
+        path = self._path(hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                data.dump(value, f)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            os.remove(tmp_path)
+            super().insert(hash, value)
+            return
+        os.replace(tmp_path, path)
+        self._index.add(hash)
+
+    def is_finished(self, hash: bytes) -> bool:
+        return hash in self._index or hash in self.cache
+
+    def is_stored(self, hash: bytes) -> bool:
+        """
+        True if the value is stored on the disk.
+        """
+        return hash in self._index
+
+
+def value_size(value) -> int:
+    """
+    Estimate of the memory occupied by the value [bytes].
+    Uses 'nbytes' of array like objects, recursion into lists, tuples and dicts.
+    """
+    nbytes = getattr(value, 'nbytes', None)
+    if isinstance(nbytes, int):
+        return nbytes
+    size = sys.getsizeof(value)
+    if isinstance(value, (list, tuple)):
+        size += sum(value_size(item) for item in value)
+    elif isinstance(value, dict):
+        size += sum(value_size(k) + value_size(v) for k, v in value.items())
+    return size
+
+
+@attr.s(auto_attribs=True)
+class CacheStats:
+    """
+    Statistics of the BoundedResultCache, used to size the memory budget.
+    """
+    n_inserted: int = 0
+    # Number of inserted values.
+    n_evicted: int = 0
+    # Number of values spilled to the disk.
+    bytes_evicted: int = 0
+    # Total size of the spilled values.
+    n_spill_loads: int = 0
+    # Number of values read back from the spill storage.
+    bytes_in_memory: int = 0
+    # Current size of values in the memory.
+    peak_bytes: int = 0
+    # Maximal size of values in the memory.
+
+
+class BoundedResultCache(ResultCache):
+    """
+    In memory result cache with limited total size of the values.
+    When the budget is exceeded the least recently used values are spilled to the DiskResultCache
+    in 'spill_dir', values still needed by the pending tasks are kept in memory.
+    Unserializable values are never spilled.
+    """
+    def __init__(self, byte_budget: int, spill_dir: str):
+        """
+        :param byte_budget: Limit for the total size of values in the memory [bytes].
+        :param spill_dir: Directory for the spilled values.
+        """
+        super().__init__()
+        self.byte_budget = byte_budget
+        self._lru: collections.OrderedDict = collections.OrderedDict()
+        # Hashes of the values that can be spilled in LRU order, the most recently used last.
+        # Values kept in the memory are out of the order, so they are not scanned by every eviction.
+        self._sizes: Dict[bytes, int] = {}
+        self._spill = DiskResultCache(spill_dir)
+        self.stats = CacheStats()
+        self._held: Set[bytes] = set()
+        # Hashes of the values needed by the pending tasks at the last eviction.
+        self._unspillable: Set[bytes] = set()
+        # Hashes of the values that can not be serialized.
+        self.needed_hashes: Callable[[], Set[bytes]] = set
+        # Returns hashes of values needed by the pending tasks, set by the Evaluation.
+
+    def value(self, hash: bytes) -> Any:
+        try:
+            value = self.cache[hash]
+        except KeyError:
+            if not self._spill.is_stored(hash):
+                return ResultCache.NoValue
+            self.stats.n_spill_loads += 1
+            return self._spill.value(hash)
+        if hash in self._lru:
+            self._lru.move_to_end(hash)
+        return value
+
+    def insert(self, hash, value):
+        if hash in self.cache:
+            self.stats.bytes_in_memory -= self._sizes[hash]
+        self._unspillable.discard(hash)
+        self._held.discard(hash)
+        size = value_size(value)
+        self.cache[hash] = value
+        self._lru[hash] = None
+        self._lru.move_to_end(hash)
+        self._sizes[hash] = size
+        self.stats.n_inserted += 1
+        self.stats.bytes_in_memory += size
+        self.stats.peak_bytes = max(self.stats.peak_bytes, self.stats.bytes_in_memory)
+        if self.stats.bytes_in_memory > self.byte_budget:
+            self._evict()
+
+    def is_finished(self, hash: bytes) -> bool:
+        return hash in self.cache or self._spill.is_stored(hash)
+
+    def release(self, hash: bytes):
+        """
+        Demote the value to the spill storage, unserializable values are dropped.
+        """
+        if hash in self.pinned or hash not in self.cache:
+            return
+        value = self.cache.pop(hash)
+        self._lru.pop(hash, None)
+        self._held.discard(hash)
+        if hash in self._unspillable:
+            self._unspillable.remove(hash)
+        else:
+            self._spill.insert(hash, value)
+            self._spill.cache.pop(hash, None)
+        self.stats.bytes_in_memory -= self._sizes.pop(hash)
+
+    def _evict(self):
+        """
+        Spill the least recently used values until the budget is satisfied.
+        The needed values are held out of the LRU order until they are not needed by
+        the pending tasks, the unserializable values forever.
+        """
+        if not self._lru and not self._held:
+            return
+        needed = self.needed_hashes()
+        not_needed = [hash for hash in self._held if hash not in needed]
+        for hash in not_needed:
+            self._held.remove(hash)
+            self._lru[hash] = None
+            self._lru.move_to_end(hash, last=False)
+        while self._lru and self.stats.bytes_in_memory > self.byte_budget:
+            hash, _ = self._lru.popitem(last=False)
+            if hash in needed:
+                self._held.add(hash)
+                continue
+            self._spill.insert(hash, self.cache[hash])
+            if not self._spill.is_stored(hash):
+                # unserializable value, kept by the spill cache in its memory
+                self._spill.cache.pop(hash)
+                self._unspillable.add(hash)
+                continue
+            del self.cache[hash]
+            size = self._sizes.pop(hash)
+            self.stats.n_evicted += 1
+            self.stats.bytes_evicted += size
+            self.stats.bytes_in_memory -= size
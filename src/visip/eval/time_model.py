@@ -0,0 +1,102 @@
+from typing import *
+import os
+import json
+
+from ..dev import base
+from ..dev.action_workflow import _Workflow
+
+
+class ExecutionTimeModel:
+    """
+    Learned model of the action evaluation times, the simplest case of the mj_api.ExecutionModel.
+    The measured wall times are recorded per action hash, the prediction is the running mean.
+    Only the last 'max_samples' measurements have significant weight, so the model follows
+    changes of the resources. Workflows are modeled by the time from their expansion to the result.
+    Other meta actions (Value, If, lazy, ...) are not modeled, their hash depends on the bound data
+    or the time depends on the bound actions.
+    The model is saved as a JSON file, typically in the workspace.
+    """
+    def __init__(self, model_path: str = None, default_time: float = 1.0, max_samples: int = 100):
+        """
+        :param model_path: Path to the model file, loaded if exists. No persistence if None.
+        :param default_time: Prediction for the actions without measurements [seconds].
+        :param max_samples: Limit of the number of samples used by the running mean.
+        """
+        self.model_path = model_path
+        self.default_time = default_time
+        self.max_samples = max_samples
+        self._stats: Dict[str, list] = {}
+        # action hash hex -> [number of samples, mean wall time, variance of the wall time]
+        self._modified = False
+        if model_path is not None and os.path.isfile(model_path):
+            try:
+                with open(model_path, 'r') as f:
+                    self._stats = json.load(f)
+            except ValueError:
+                # corrupted model, start again
+                pass
+
+    @staticmethod
+    def _key(action) -> Optional[str]:
+        if action.action_kind is base.ActionKind.Meta and not isinstance(action, _Workflow):
+            return None
+        return action.action_hash().hex()
+
+    def _action_stats(self, action) -> Optional[list]:
+        key = self._key(action)
+        if key is None:
+            return None
+        return self._stats.get(key, None)
+
+    def record(self, action, wall_time: float):
+        """
+        Add measured wall time of the action evaluation [seconds].
+        """
+        key = self._key(action)
+        if key is None:
+            return
+        n, mean, var = self._stats.get(key, (0, 0.0, 0.0))
+        # Incremental mean and variance, the weight of the new sample is at least 1 / max_samples.
+        n = min(n + 1, self.max_samples)
+        weight = 1 / n
+        delta = wall_time - mean
+        mean += weight * delta
+        var = (1 - weight) * (var + weight * delta * delta)
+        self._stats[key] = [n, mean, var]
+        self._modified = True
+
+    def predict(self, action) -> float:
+        """
+        Predicted wall time of the action evaluation [seconds].
+        """
+        stats = self._action_stats(action)
+        if stats is None:
+            return self.default_time
+        return stats[1]
+
+    def std(self, action) -> float:
+        """
+        Standard deviation of the measured wall times, zero if not measured.
+        """
+        stats = self._action_stats(action)
+        if stats is None:
+            return 0.0
+        return stats[2] ** 0.5
+
+    def n_samples(self, action) -> int:
+        stats = self._action_stats(action)
+        if stats is None:
+            return 0
+        return stats[0]
+
+    def save(self):
+        """
+        Write the model file if there are any changes.
+        """
+        if self.model_path is None or not self._modified:
+            return
+        tmp_path = f"{self.model_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self._stats, f)
+        os.replace(tmp_path, self.model_path)
+        self._modified = False
@@ -1,5 +1,7 @@
 import os
+import asyncio
 import shutil
+import time
 import visip.dev.tools as tools
 import visip as wf
 from visip.dev import evaluation
@@ -92,6 +94,59 @@ def test_file_from_template_wf():
     assert content.find('my_mesh.msh')
 
 
+N_SLEEPS = 8
+SLEEP_TIME = 0.5
+
+@wf.analysis
+def parallel_sleeps():
+    return [wf.system(['sh', '-c', f"sleep {SLEEP_TIME}; echo {i}"], stdout=wf.SysFile.PIPE)
+            for i in range(N_SLEEPS)]
+
+
+def test_thread_pool_system():
+    resource = evaluation.ThreadPoolResource(n_threads=N_SLEEPS)
+    start = time.perf_counter()
+    result = evaluation.Evaluation(workspace=script_dir, resources=[resource]).run(parallel_sleeps).result
+    elapsed = time.perf_counter() - start
+    resource.shutdown()
+    assert [r.stdout for r in result] == [f"{i}\n".encode() for i in range(N_SLEEPS)]
+    assert elapsed < 3 * SLEEP_TIME
+
+
+@wf.analysis
+def long_sleep():
+    return wf.system(['sh', '-c', "sleep 1; echo done"], stdout=wf.SysFile.PIPE)
+
+
+def test_idle_evaluation():
+    # The evaluation loop waits for the resources instead of polling them.
+    resource = evaluation.ThreadPoolResource(n_threads=1)
+    cpu_start = time.process_time()
+    result = evaluation.Evaluation(workspace=script_dir, resources=[resource]).run(long_sleep).result
+    cpu_time = time.process_time() - cpu_start
+    resource.shutdown()
+    assert result.stdout == b"done\n"
+    assert cpu_time < 0.5
+
+
+N_ASYNC_SLEEPS = 50
+
+@wf.analysis
+def many_sleeps():
+    return [wf.system(['sh', '-c', f"sleep {SLEEP_TIME}; echo {i}"], stdout=wf.SysFile.PIPE)
+            for i in range(N_ASYNC_SLEEPS)]
+
+
+def test_async_system():
+    resource = evaluation.AsyncResource()
+    evaluation_ = evaluation.Evaluation(workspace=script_dir, resources=[resource])
+    start = time.perf_counter()
+    result = asyncio.run(evaluation_.run_async(many_sleeps)).result
+    elapsed = time.perf_counter() - start
+    assert [r.stdout for r in result] == [f"{i}\n".encode() for i in range(N_ASYNC_SLEEPS)]
+    assert elapsed < 3 * SLEEP_TIME
+
+
 def test_file_action_skipping():
     # Test that external operations are skipped once files are the same
     pass
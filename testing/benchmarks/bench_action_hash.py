@@ -0,0 +1,59 @@
+"""
+Creation time of tasks calling a three level nested workflow.
+Every task computes its result hash from the action hash of the workflow.
+Compared with the action hashes invalidated before every task, i.e. recomputed
+from the whole hierarchy of the nested workflows.
+
+Usage:
+    python bench_action_hash.py [n_tasks]
+"""
+import sys
+import time
+import visip as wf
+from visip.dev import base, task, tools
+from visip.action import constructor
+
+
+@wf.action_def
+def _scale(a: float, b: float) -> float:
+    return a * b
+
+
+@wf.workflow
+def _level_1(x):
+    return _scale(x, 2) + _scale(x, 3)
+
+
+@wf.workflow
+def _level_2(x):
+    return [_level_1(x), _level_1(x + 1), _level_1(x * 2)]
+
+
+@wf.workflow
+def _level_3(x):
+    return (_level_2(x), _level_2(x - 1), _level_1(x))
+
+
+def make_tasks(n_tasks, invalidate):
+    unary = ([0], {})
+    tasks = []
+    for i in range(n_tasks):
+        if invalidate:
+            base.ActionBase.definition_modified()
+        value = task.TaskSchedule._create_task(None, tools.TaskBinding('value', constructor.Value(i), ([], {}), []))
+        binding = tools.TaskBinding('level_3', _level_3._action_value, unary, [value])
+        tasks.append(task.TaskSchedule._create_task(None, binding))
+    return tasks
+
+
+def main(n_tasks=100000):
+    make_tasks(10, False)  # warm up
+    for label, invalidate, n in [("invalidated", True, n_tasks // 100), ("memoized", False, n_tasks)]:
+        start = time.perf_counter()
+        make_tasks(n, invalidate)
+        elapsed = time.perf_counter() - start
+        print(f"{label:12}: {n:7} tasks, {elapsed:8.3f} s, {elapsed / n * 1e6:8.1f} us per task")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,60 @@
+"""
+Evaluation time of many composed tasks blocked on their inputs, e.g. If waiting for the condition.
+The conditions are evaluated one by one on a single thread, so the tasks are unblocked gradually.
+The number of expansion attempts should grow linearly with the number of If tasks.
+
+Usage:
+    python bench_blocked.py [n_items]
+"""
+import sys
+import time
+import logging
+import visip as wf
+from visip.dev import evaluation, task
+
+
+@wf.action_def
+def _is_even(i: int) -> bool:
+    time.sleep(0.0001)
+    return i % 2 == 0
+
+
+@wf.action_def
+def _half(i: int) -> int:
+    return i // 2
+
+
+@wf.workflow
+def _halve_even(i):
+    return wf.If(_is_even(i), wf.lazy(_half, i), wf.lazy(wf.Pass, i))
+
+
+@wf.workflow
+def halve_even(items):
+    return wf.ForEach(_halve_even, items)
+
+
+def main(n_items=2000):
+    logging.disable(logging.INFO)
+    n_expand = 0
+    expand = task.Composed.expand
+    def counted_expand(*args, **kwargs):
+        nonlocal n_expand
+        n_expand += 1
+        return expand(*args, **kwargs)
+    task.Composed.expand = counted_expand
+
+    for n in [n_items // 4, n_items // 2, n_items]:
+        n_expand = 0
+        resource = evaluation.ThreadPoolResource(n_threads=1)
+        evaluation_ = evaluation.Evaluation(resources=[resource], fusion_time=None)
+        start = time.perf_counter()
+        result = evaluation_.run(halve_even, list(range(n))).result
+        elapsed = time.perf_counter() - start
+        resource.shutdown()
+        assert result == [i // 2 if i % 2 == 0 else i for i in range(n)]
+        print(f"{n:6} items: {elapsed:8.3f} s, {n_expand:8} expansions, {n_expand / n:6.1f} per item")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,50 @@
+"""
+Expansion throughput of a workflow with about 200 action calls.
+The child tasks are not created, so just the expansion overhead of the workflow is measured.
+Compared with the definitions modified before every expansion, i.e. the expansion plan
+rebuilt by the full update of the workflow.
+
+Usage:
+    python bench_expand.py [n_expansions]
+"""
+import sys
+import time
+import visip as wf
+from visip.dev import base, task, tools
+from visip.action import constructor
+
+N_PAIRS = 50
+
+
+@wf.workflow
+def operator_chain(x):
+    pair = [x, x]
+    for i in range(N_PAIRS):
+        pair = [pair[1] * 2 - pair[0], pair[0] + 1]
+    return pair[0]
+
+
+def expand_many(n_expansions, modify):
+    workflow = operator_chain._action_value
+    value = task.TaskSchedule._create_task(None, tools.TaskBinding('x', constructor.Value(1), ([], {}), []))
+    composed = task.TaskSchedule._create_task(None, tools.TaskBinding('chain', workflow, ([0], {}), [value]))
+    create_binding = lambda task_binding: task_binding
+    n_calls = 0
+    for i in range(n_expansions):
+        if modify:
+            base.ActionBase.definition_modified()
+        n_calls = len(workflow.expand(composed, create_binding, None))
+    return n_calls
+
+
+def main(n_expansions=2000):
+    expand_many(10, False)  # warm up
+    for label, modify in [("modified", True), ("memoized", False)]:
+        start = time.perf_counter()
+        n_calls = expand_many(n_expansions, modify)
+        elapsed = time.perf_counter() - start
+        print(f"{label:10}: {n_calls} calls, {n_expansions / elapsed:10.0f} expansions per second")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,53 @@
+"""
+Evaluation time of an operator heavy workflow with and without the task fusion.
+The workflow is a chain of cheap operators and item accesses, so the evaluation time
+is given just by the overhead of the scheduler.
+
+Usage:
+    python bench_fusion.py [chain_length] [n_threads]
+"""
+import sys
+import time
+import logging
+import visip as wf
+from visip.dev import evaluation
+
+CHAIN_LENGTH = 500
+
+
+@wf.workflow
+def operator_chain(x):
+    pair = [x, x]
+    for i in range(CHAIN_LENGTH):
+        pair = [pair[1] * 2 - pair[0], pair[0] + 1]
+    return pair[0]
+
+
+def eval_time(resources, fusion_time):
+    evaluation_ = evaluation.Evaluation(resources=resources, fusion_time=fusion_time)
+    start = time.perf_counter()
+    result = evaluation_.run(operator_chain, 1).result
+    elapsed = time.perf_counter() - start
+    return elapsed, evaluation_.expansion_iter, result
+
+
+def main(chain_length=CHAIN_LENGTH, n_threads=4):
+    global CHAIN_LENGTH
+    CHAIN_LENGTH = chain_length
+    logging.disable(logging.INFO)
+    for res_name, make_resources in [
+            ("Resource", lambda: None),
+            (f"ThreadPoolResource({n_threads})", lambda: [evaluation.ThreadPoolResource(n_threads=n_threads)])]:
+        results = []
+        for label, fusion_time in [("no fusion", None), ("fusion", 1e-4)]:
+            resources = make_resources()
+            elapsed, n_iter, result = eval_time(resources, fusion_time)
+            for res in resources or []:
+                res.shutdown()
+            results.append(result)
+            print(f"{res_name:24} {label:10}: {elapsed:8.3f} s, {n_iter:5} loop iterations")
+        assert results[0] == results[1]
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
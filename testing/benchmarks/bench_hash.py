@@ -0,0 +1,38 @@
+"""
+Microbenchmark of the task ID computation: action hash chained with the input hashes.
+Compares the chained data.hash calls with the single call data.hash_list for all hash backends.
+
+Usage:
+    python bench_hash.py [n_tasks]
+"""
+import sys
+import time
+from visip.dev import data
+
+
+def chained_ids(action_hash, inputs, n_tasks):
+    for i in range(n_tasks):
+        task_hash = action_hash
+        for input_hash in inputs:
+            task_hash = data.hash(input_hash, previous=task_hash)
+
+
+def hash_list_ids(action_hash, inputs, n_tasks):
+    for i in range(n_tasks):
+        data.hash_list(inputs, previous=action_hash)
+
+
+def main(n_tasks=1000000, n_inputs=3):
+    for backend in data.hash_backends:
+        with data.hash_backend(backend):
+            action_hash = data.hash("action")
+            inputs = [data.hash(i) for i in range(n_inputs)]
+            for fn in [chained_ids, hash_list_ids]:
+                start = time.perf_counter()
+                fn(action_hash, inputs, n_tasks)
+                elapsed = time.perf_counter() - start
+                print(f"{backend:8} {fn.__name__:14} {n_tasks} tasks: {elapsed:7.3f} s")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,62 @@
+"""
+Makespan of a wide and deep DAG of sleeping tasks on a ThreadPoolResource.
+Compares the critical path priorities of the Scheduler with the FIFO order
+(constant TaskSchedule.priority).
+
+The DAG consists of 'width' independent tasks listed first and a chain of 'depth' tasks.
+The lower bound of the makespan is max(depth, (width + depth) / n_threads) * sleep_time.
+
+Usage:
+    python bench_schedule.py [width] [depth] [n_threads]
+"""
+import sys
+import time
+import visip as wf
+from visip.dev import evaluation, task
+
+SLEEP_TIME = 0.05
+WIDTH = 24
+DEPTH = 8
+
+
+@wf.action_def
+def sleep_step(i: int, prev: int) -> int:
+    time.sleep(SLEEP_TIME)
+    return prev + 1
+
+
+@wf.analysis
+def wide_and_deep():
+    independent = [sleep_step(i, 0) for i in range(-WIDTH, 0)]
+    chain = 0
+    for i in range(DEPTH):
+        chain = sleep_step(i, chain)
+    return [independent, chain]
+
+
+def makespan(n_threads):
+    resource = evaluation.ThreadPoolResource(n_threads=n_threads)
+    start = time.perf_counter()
+    result = evaluation.Evaluation(resources=[resource]).run(wide_and_deep).result
+    elapsed = time.perf_counter() - start
+    resource.shutdown()
+    assert result[1] == DEPTH
+    return elapsed
+
+
+def main(width=WIDTH, depth=DEPTH, n_threads=4):
+    global WIDTH, DEPTH
+    WIDTH, DEPTH = width, depth
+    bound = max(depth, (width + depth) / n_threads) * SLEEP_TIME
+    print(f"width {width}, depth {depth}, {n_threads} threads, lower bound {bound:.3f} s")
+    print(f"critical path: {makespan(n_threads):.3f} s")
+    cpm_priority = task.TaskSchedule.priority
+    task.TaskSchedule.priority = property(lambda self: 1)
+    try:
+        print(f"fifo:          {makespan(n_threads):.3f} s")
+    finally:
+        task.TaskSchedule.priority = cpm_priority
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
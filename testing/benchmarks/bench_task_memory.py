@@ -0,0 +1,47 @@
+"""
+Memory of the task DAG per task: a chain of atomic tasks, each with two inputs,
+and a composed task for every 'composed_period' atomic tasks.
+Measured by tracemalloc, excluding the shared actions and hashes of the inputs.
+
+Usage:
+    python bench_task_memory.py [n_tasks]
+"""
+import sys
+import tracemalloc
+from visip.dev import task, tools
+from visip.action import constructor, wrapped
+
+
+def make_tasks(n_tasks, composed_period=10):
+    value = task.TaskSchedule._create_task(None, tools.TaskBinding('value', constructor.Value(1), ([], {}), []))
+    pass_ = wrapped.Pass._action_value
+    pair = constructor.A_tuple()
+    for_each = wrapped.ForEach._action_value
+    # Argument bindings are shared by the tasks of the same action call.
+    unary, binary = ([0], {}), ([0, 1], {})
+    tasks = [value]
+    prev = value
+    for i in range(n_tasks):
+        if i % composed_period == 0:
+            binding = tools.TaskBinding('for_each', for_each, binary, [value, prev])
+        elif i % 2:
+            binding = tools.TaskBinding('pass', pass_, unary, [prev])
+        else:
+            binding = tools.TaskBinding('pair', pair, binary, [value, prev])
+        prev = task.TaskSchedule._create_task(None, binding)
+        tasks.append(prev)
+    return tasks
+
+
+def main(n_tasks=100000):
+    make_tasks(10)  # warm up, e.g. lazy action hashes
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    tasks = make_tasks(n_tasks)
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{n_tasks} tasks: {(end - start) / len(tasks):.0f} bytes per task")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,50 @@
+"""
+Evaluation time of a While loop with growing number of iterations.
+The time per iteration should be independent of the number of iterations.
+
+Usage:
+    python bench_while.py [max_iterations]
+"""
+import sys
+import time
+import logging
+import visip as wf
+from visip.dev import evaluation
+
+
+@wf.action_def
+def _positive(i: int) -> bool:
+    return i > 0
+
+
+@wf.action_def
+def _decrement(i: int) -> int:
+    return i - 1
+
+
+@wf.workflow
+def _countdown_body(i):
+    false_body = wf.lazy(wf.Pass, None)
+    true_body = wf.lazy(_decrement, i)
+    return wf.If(_positive(i), true_body, false_body)
+
+
+@wf.workflow
+def countdown(n):
+    return wf.While(_countdown_body, n)
+
+
+def main(max_iterations=10000):
+    logging.disable(logging.INFO)
+    n = max(max_iterations // 8, 1)
+    while n <= max_iterations:
+        start = time.perf_counter()
+        result = evaluation.Evaluation().run(countdown, n).result
+        elapsed = time.perf_counter() - start
+        assert result == 0
+        print(f"{n:7} iterations: {elapsed:8.3f} s, {elapsed / n * 1e3:6.3f} ms/iteration")
+        n *= 2
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -1,3 +1,4 @@
+import pytest
 from visip.dev import data
 from typing import *
 import attr
@@ -20,4 +21,111 @@ def test_data():
     hb2 = data.hash(b_inst2)
     assert hb1 == hb2
     b_inst.a = 134
-    assert hb1 != data.hash(b_inst)
\ No newline at end of file
+    assert hb1 != data.hash(b_inst)
+
+def test_structural_hash():
+    assert data.hash([1, 2]) != data.hash((1, 2))
+    assert data.hash([1, [2]]) != data.hash([[1], 2])
+    assert data.hash({1: 'a', 2: 'b'}) == data.hash({2: 'b', 1: 'a'})
+    assert data.hash(1) != data.hash(1.0)
+    assert data.hash(1) != data.hash(True)
+    assert data.hash("1") != data.hash(b"1")
+    assert data.hash(1, previous=b"a") != data.hash(1, previous=b"b")
+    shared = [A((1, 2))] * 3
+    assert data.hash(shared) == data.hash([A((1, 2)), A((1, 2)), A((1, 2))])
+
+
+def test_numpy_hash():
+    np = pytest.importorskip("numpy")
+    a = np.arange(1000000, dtype=float)
+    b = a.copy()
+    assert data.hash(a) == data.hash(b)
+    b[-1] = 0
+    # differs only in the part hidden by the truncated repr
+    assert data.hash(a) != data.hash(b)
+    assert data.hash(a) != data.hash(a.astype(np.float32))
+    assert data.hash(a) != data.hash(a.reshape(1000, 1000))
+    assert data.hash(a[::2]) == data.hash(a[::2].copy())
+
+    # read only views of writable data are not memoized
+    a.flags.writeable = False
+    view = a[:10].view()
+    broadcast = np.broadcast_to(a[:10], (3, 10))
+    digests = [data.hash(x) for x in (a, view, broadcast)]
+    a.flags.writeable = True
+    a[0] = 5
+    assert all(data.hash(x) != digest for x, digest in zip((a, view, broadcast), digests))
+    assert all(key[0] != id(x) for key in data._DataHasher._array_memo for x in (a, view, broadcast))
+
+    # views into the immutable stream are memoized, separately for every hash backend
+    a = data.deserialize(data.serialize(np.arange(10)))
+    assert data.hash(a) == data.hash(a)
+    with data.hash_backend('blake2b'):
+        assert data.hash(a) != data.hash(np.arange(10, dtype=float))
+        assert len(data.hash(a)) == 16
+    assert len(data.hash(a)) == 32
+    assert sum(key[0] == id(a) for key in data._DataHasher._array_memo) == 2
+    key = id(a)
+    del a
+    assert all(k[0] != key for k in data._DataHasher._array_memo)
+
+
+def test_file_hash_index(tmp_path, monkeypatch):
+    index_path = str(tmp_path / "index.json")
+    file_path = str(tmp_path / "input.txt")
+    with open(file_path, "w") as f:
+        f.write("content")
+    content_hash = data.hash_file(file_path)
+
+    n_reads = 0
+    hash_file_content = data._hash_file_content
+    def count_reads(path):
+        nonlocal n_reads
+        n_reads += 1
+        return hash_file_content(path)
+    monkeypatch.setattr(data, "_hash_file_content", count_reads)
+
+    with data.use_file_hash_index(data.FileHashIndex(index_path)):
+        assert data.hash_file(file_path) == content_hash
+        assert data.hash_file(file_path) == content_hash
+    assert n_reads == 1
+    assert data.file_hash_index is None
+
+    index = data.FileHashIndex(index_path)
+    assert index.hash_file(file_path) == content_hash
+    assert n_reads == 1
+    with open(file_path, "w") as f:
+        f.write("new content")
+    assert index.hash_file(file_path) != content_hash
+    assert n_reads == 2
+
+
+def test_serialize():
+    b_inst = B(a=123, b="ahoj", c=[A((1, 2))], d={1: A((5, 6))})
+    assert data.deserialize(data.serialize(b_inst)) == b_inst
+    assert data.deserialize(data.serialize(bytearray(b"abc"))) == bytearray(b"abc")
+    # plain pickle stream
+    import pickle
+    assert data.deserialize(pickle.dumps([1, 2])) == [1, 2]
+
+
+def test_serialize_numpy(tmp_path):
+    np = pytest.importorskip("numpy")
+    arrays = [np.arange(1000, dtype=float), np.ones((10, 3), dtype=np.int8)]
+    stream = data.serialize(arrays)
+    loaded = data.deserialize(stream)
+    stream_address = np.frombuffer(stream, dtype=np.uint8).ctypes.data
+    for a, b in zip(arrays, loaded):
+        assert np.array_equal(a, b)
+        assert a.dtype == b.dtype
+        # aligned view into the read only stream
+        assert not b.flags.writeable
+        assert (b.ctypes.data - stream_address) % 64 == 0
+
+    from visip.eval.cache import DiskResultCache
+    cache = DiskResultCache(str(tmp_path), mmap_threshold=0)
+    cache.insert(b'\x01\x02', arrays)
+    loaded = cache.value(b'\x01\x02')
+    assert np.array_equal(loaded[0], arrays[0])
+    assert not loaded[0].flags.writeable
+    assert loaded[0].ctypes.data % 64 == 0
@@ -1,8 +1,11 @@
 import pytest
 import os
+import time
+import asyncio
 
 from visip.dev import evaluation, task, module
 from visip.code import decorators
+import visip as wf
 
 script_dir = os.path.dirname(os.path.realpath(__file__))
 
@@ -72,3 +75,240 @@ def test_action_skipping():
     result = evaluation.run(make_calls)
     assert len(result) == 3
     assert global_n_calls == 2
+
+
+@decorators.action_def
+def pid_of_worker(a: int) -> int:
+    return os.getpid()
+
+
+@decorators.analysis
+def make_pid_calls(self):
+    return [pid_of_worker(i) for i in range(8)]
+
+
+def test_process_pool_resource():
+    cache = evaluation.ResultCache()
+    resource = evaluation.ProcessPoolResource(cache, n_workers=2)
+    scheduler = evaluation.Scheduler([resource], cache)
+    result = evaluation.Evaluation(scheduler=scheduler).run(make_pid_calls).result
+    resource.shutdown()
+    assert len(result) == 8
+    assert os.getpid() not in result
+
+
+@decorators.action_def
+def make_data(size: int) -> bytes:
+    return bytes(size)
+
+
+@decorators.action_def
+def big_stage(prev: bytes, i: int) -> bytes:
+    return bytes([i % 256]) * len(prev)
+
+
+@decorators.action_def
+def data_len(x: bytes) -> int:
+    return len(x)
+
+
+@decorators.analysis
+def big_chain(self):
+    x = big_stage(make_data(100000), 0)
+    for i in range(1, 20):
+        x = big_stage(x, i)
+    return data_len(x)
+
+
+def test_release_intermediates():
+    eval = evaluation.Evaluation(release_intermediates=True)
+    result = eval.run(big_chain)
+    assert result.result == 100000
+    cached_bytes = [v for v in eval.cache.cache.values() if isinstance(v, bytes)]
+    assert len(cached_bytes) == 0
+
+
+ASYNC_SLEEP_TIME = 0.2
+
+@decorators.action_def
+async def async_sleep(i: int) -> int:
+    await asyncio.sleep(ASYNC_SLEEP_TIME)
+    return i
+
+
+@decorators.analysis
+def async_sleeps(self):
+    return [async_sleep(i) for i in range(10)]
+
+
+def test_run_async():
+    resource = evaluation.AsyncResource()
+    start = time.perf_counter()
+    result = asyncio.run(evaluation.Evaluation(resources=[resource]).run_async(async_sleeps)).result
+    elapsed = time.perf_counter() - start
+    assert result == list(range(10))
+    assert elapsed < 5 * ASYNC_SLEEP_TIME
+
+    # coroutine actions are evaluated by the synchronous resources as well
+    result = evaluation.Evaluation().run(async_sleeps).result
+    assert result == list(range(10))
+
+
+@decorators.action_def
+def current_dir(i: int) -> str:
+    return os.getcwd()
+
+
+@decorators.workflow
+def sleep_current_dir(i):
+    return current_dir(async_sleep(i))
+
+
+def test_run_async_workspaces(tmp_path):
+    # overlapping evaluations, each action runs in the workspace of its evaluation
+    workspaces = [str(tmp_path / "ws_a"), str(tmp_path / "ws_b")]
+    async def run_both():
+        evaluations = [evaluation.Evaluation(workspace=ws, resources=[evaluation.AsyncResource()])
+                       for ws in workspaces]
+        first = asyncio.ensure_future(evaluations[0].run_async(sleep_current_dir, 0))
+        await asyncio.sleep(ASYNC_SLEEP_TIME / 2)
+        second = asyncio.ensure_future(evaluations[1].run_async(sleep_current_dir, 1))
+        return [result.result for result in await asyncio.gather(first, second)]
+
+    cwd = os.getcwd()
+    assert asyncio.run(run_both()) == [os.path.realpath(ws) for ws in workspaces]
+    assert os.getcwd() == cwd
+
+
+def test_run_async_default_resource():
+    # coroutine actions evaluated by the default Resource within the running event loop
+    result = asyncio.run(evaluation.Evaluation().run_async(async_sleeps)).result
+    assert result == list(range(10))
+
+
+@decorators.workflow
+def shared_calls(a, b):
+    return [count_calls(a), count_calls(b)]
+
+
+def test_run_many():
+    global global_n_calls
+    global_n_calls = 0
+    arg_list = [(0, 1), (1, 2), {'a': 2, 'b': 0}]
+    results = evaluation.Evaluation().run_many(shared_calls, arg_list)
+    assert [r.result for r in results] == [[0, 2], [2, 4], [4, 0]]
+    # common calls are evaluated once
+    assert global_n_calls == 3
+
+    # equal analyses share a single root task
+    eval = evaluation.Evaluation()
+    results = eval.run_many(shared_calls, [(0, 1), (0, 1)])
+    assert [r.result for r in results] == [[0, 2], [0, 2]]
+    assert eval.final_tasks[0] is eval.final_tasks[1]
+
+
+def test_evaluation_reuse():
+    global global_n_calls
+    global_n_calls = 0
+    eval = evaluation.Evaluation()
+    assert eval.run(shared_calls, 0, 1).result == [0, 2]
+    assert global_n_calls == 2
+    # warm cache, only the changed call is evaluated
+    assert eval.run(shared_calls, 0, 3).result == [0, 6]
+    assert global_n_calls == 3
+    assert eval.run(shared_calls, 0, 1).result == [0, 2]
+    assert global_n_calls == 3
+
+
+@decorators.workflow
+def operator_chain(x):
+    pair = [x, x]
+    for i in range(20):
+        pair = [pair[1] * 2 - pair[0], pair[0] + 1]
+    return pair[0]
+
+
+def test_task_fusion():
+    eval_plain = evaluation.Evaluation(fusion_time=None)
+    result_plain = eval_plain.run(operator_chain, 1)
+    eval_fused = evaluation.Evaluation()
+    result_fused = eval_fused.run(operator_chain, 1)
+    assert result_fused.result == result_plain.result
+    # the chain of cheap tasks is evaluated in a single update
+    assert eval_fused.expansion_iter < 5 < eval_plain.expansion_iter
+    # results of the fused tasks are available
+    fused_child = result_fused.child('operator_chain_1').child('mul_2')
+    assert fused_child.result == result_plain.child('operator_chain_1').child('mul_2').result
+
+
+@decorators.analysis
+def repeated_sub_dags(self):
+    return [shared_calls(1, 2), shared_calls(1, 2), shared_calls(2, 1)]
+
+
+def test_task_interning():
+    global global_n_calls
+    global_n_calls = 0
+    eval = evaluation.Evaluation()
+    result = eval.run(repeated_sub_dags)
+    assert result.result == [[2, 4], [2, 4], [4, 2]]
+    assert global_n_calls == 2
+    # Equal sub-computations share the task.
+    root = result.child('repeated_sub_dags_1')
+    assert root.child('shared_calls_1')._task is root.child('shared_calls_2')._task
+    first, last = root.child('shared_calls_1'), root.child('shared_calls_3')
+    assert first.child('count_calls_1')._task is last.child('count_calls_2')._task
+
+
+@decorators.action_def
+def decrement(i: int) -> int:
+    return i - 1
+
+
+@decorators.workflow
+def decrement_all(items):
+    return wf.ForEach(decrement, items)
+
+
+def test_large_gather(monkeypatch):
+    # Ready tasks wait in the queue while the resource is busy, the gather of all results is ready just once.
+    n_pops = 0
+    heap_pop = evaluation.IndexedHeap.pop
+    def counted_pop(heap):
+        nonlocal n_pops
+        n_pops += 1
+        return heap_pop(heap)
+    monkeypatch.setattr(evaluation.IndexedHeap, 'pop', counted_pop)
+
+    n_items = 1000
+    cache = evaluation.ResultCache()
+    resource = evaluation.ThreadPoolResource(cache, n_threads=1)
+    scheduler = evaluation.Scheduler([resource], cache)
+    eval = evaluation.Evaluation(scheduler=scheduler, fusion_time=None)
+    result = eval.run(decrement_all, list(range(n_items))).result
+    resource.shutdown()
+    assert result == list(range(-1, n_items - 1))
+    # three tasks per item: index, item and the body call
+    assert n_pops < 2.5 * len(eval.task_table)
+
+
+@decorators.action_def
+def positive(i: int) -> bool:
+    return i > 0
+
+
+@decorators.workflow
+def countdown_body(i):
+    return wf.If(positive(i), wf.lazy(decrement, i), wf.lazy(wf.Pass, None))
+
+
+@decorators.workflow
+def countdown(n):
+    return wf.While(countdown_body, n)
+
+
+def test_release_intermediates_interning():
+    # Interned tasks with released results are evaluated again.
+    assert evaluation.Evaluation(release_intermediates=True).run(countdown, 5).result == 0
+    result = evaluation.Evaluation(release_intermediates=True).run(repeated_sub_dags)
+    assert result.result == [[2, 4], [2, 4], [4, 2]]
@@ -81,6 +81,66 @@ def test_meta():
     assert fac1.workflow.action_hash() == fac2.workflow.action_hash()
     assert fac1.workflow.action_hash() != fac3.workflow.action_hash()
 
+@visip.workflow
+def inner_wf(a: int):
+    return a + 1
+
+@visip.workflow
+def outer_wf(a: int):
+    return inner_wf(a)
+
+def test_workflow_hash_invalidation():
+    inner, outer = inner_wf.workflow, outer_wf.workflow
+    inner_hash, outer_hash = inner.action_hash(), outer.action_hash()
+    # memoized
+    assert outer.action_hash() is outer_hash
+    # modification of the nested workflow changes both hashes
+    assert inner.set_action_input(inner.result_call, 0, inner.slots[0])
+    assert inner.action_hash() != inner_hash
+    assert outer.action_hash() != outer_hash
+
+
+@visip.workflow
+def outer_wf2(a: int):
+    return [outer_wf(a), a]
+
+
+def test_workflow_hash_kept_by_evaluation():
+    from visip.dev import base, evaluation
+    outer = outer_wf2.workflow
+    outer_hash = outer.action_hash()
+    plan = outer._expansion_plan()
+    # building the analysis workflow of every run does not invalidate the memos
+    version = base.ActionBase._edit_version
+    for i in range(3):
+        assert evaluation.Evaluation().run(outer_wf2, i).result[1] == i
+    assert base.ActionBase._edit_version == version
+    assert outer.action_hash() is outer_hash
+    assert outer._expansion_plan() is plan
+
+
+@visip.action_def
+def same_name(a: int) -> int:
+    return a - 1
+first_same_name = same_name
+
+
+@visip.action_def
+def same_name(a: int) -> int:
+    return a - 2
+second_same_name = same_name
+
+
+def test_action_value_hash():
+    # actions passed as values (lazy, If, While, ...) are hashed by their definition
+    from visip.action.constructor import Value
+    first, second = first_same_name._action_value, second_same_name._action_value
+    assert first.name == second.name
+    assert data.hash(first) != data.hash(second)
+    assert Value(first).action_hash() != Value(second).action_hash()
+    assert Value(first).action_hash() == Value(first).action_hash()
+
+
 def test_data():
     a = data.hash(std.SysFile.PIPE._value.action.value)
     b = data.hash(std.SysFile.STDOUT._value.action.value)
@@ -89,3 +149,33 @@ def test_data():
     assert a != c
     assert b != c
 
+
+
+def test_hash_list():
+    hashes = [data.hash(i) for i in range(3)]
+    assert data.hash_list(hashes) == data.hash_list(hashes)
+    assert data.hash_list(hashes) != data.hash_list(reversed(hashes))
+    assert data.hash_list(hashes) != data.hash_list(hashes, previous=b"a")
+
+
+@visip.analysis
+def fac_analysis():
+    return fac3(4)
+
+
+def test_hash_backend():
+    from visip.dev import evaluation
+    eval = evaluation.Evaluation(hash_backend='blake2b')
+    result = eval.run(fac_analysis)
+    assert result.result == 24
+    assert len(eval.final_task.result_hash) == 16
+    assert data.default_hash is data.hash_backends['sha256']
+    with data.hash_backend('blake2b'):
+        assert len(data.hash(1)) == 16
+    assert len(data.hash(1)) == 32
+
+    # memoized action hashes follow the backend
+    action = fac_analysis._action_value
+    with data.hash_backend('blake2b'):
+        assert len(action.action_hash()) == 16
+    assert len(action.action_hash()) == 32
@@ -0,0 +1,41 @@
+import random
+from visip.dev.indexed_heap import IndexedHeap
+
+
+class Item:
+    def __init__(self, i):
+        self.i = i
+
+
+def test_indexed_heap():
+    random.seed(1)
+    items = [Item(i) for i in range(200)]
+    priorities = {id(item): random.randint(0, 50) for item in items}
+    heap = IndexedHeap()
+    for item in items:
+        heap.push(item, priorities[id(item)])
+    # duplicate push is ignored
+    heap.push(items[0], -1)
+    assert len(heap) == len(items)
+    assert items[0] in heap
+
+    # repeated updates, including back to the original priority
+    updated = items[::3]
+    for item in updated:
+        heap.update(item, 100)
+        priorities[id(item)] = random.randint(-20, 70)
+        heap.update(item, priorities[id(item)])
+    heap.update(Item(-1), 0)
+    assert len(heap) == len(items)
+
+    popped = []
+    while heap:
+        popped.append(heap.pop())
+    assert len(popped) == len(items)
+    assert items[0] not in heap
+    keys = [priorities[id(item)] for item in popped]
+    assert keys == sorted(keys)
+    # FIFO for equal priorities of the not updated items
+    for a, b in zip(popped[:-1], popped[1:]):
+        if priorities[id(a)] == priorities[id(b)] and a.i % 3 and b.i % 3:
+            assert a.i < b.i
@@ -1,6 +1,6 @@
 import pytest
 import visip as wf
-from visip.dev import evaluation
+from visip.dev import evaluation, task
 from visip.dev import exceptions
 import pytest
 # script_dir = os.path.dirname(os.path.realpath(__file__))
@@ -223,6 +223,106 @@ def test_while():
     assert evaluation.run(fibonacci, 3) == 3
     assert evaluation.run(fibonacci, 4) == 5
 
+
+@wf.workflow
+def _countdown_body(i):
+    false_body = wf.lazy(wf.Pass, None)
+    true_body = wf.lazy(_fib_dec, i)
+    return wf.If(_fib_cond(i), true_body, false_body)
+
+@wf.workflow
+def countdown(n):
+    return wf.While(_countdown_body, n)
+
+def test_while_deep():
+    # Nested expanded tasks of the iterations do not block further expansion.
+    cache = evaluation.ResultCache()
+    scheduler = evaluation.Scheduler([evaluation.Resource(cache)], cache, n_tasks_limit=32)
+    assert evaluation.Evaluation(scheduler=scheduler).run(countdown, 30).result == 0
+
+
+def test_while_stream():
+    assert list(evaluation.Evaluation().stream(countdown, 5)) == [5, 4, 3, 2, 1, 0]
+    # early stop by the consumer
+    states = []
+    for state in evaluation.Evaluation().stream(countdown, 1000):
+        states.append(state)
+        if state == 990:
+            break
+    assert states == list(range(1000, 989, -1))
+
+
+@wf.action_def
+def _add(a: int, b: int) -> int:
+    return a + b
+
+@wf.workflow
+def shifted(items, shift):
+    return wf.ForEach(wf.lazy(_add, wf.empty, shift), items)
+
+def test_for_each():
+    assert evaluation.run(shifted, [], 1) == []
+    assert evaluation.run(shifted, [1, 2, 3], 10) == [11, 12, 13]
+    # All calls are created by a single expansion.
+    n_items = 200
+    eval = evaluation.Evaluation()
+    assert eval.run(shifted, list(range(n_items)), 1).result == list(range(1, n_items + 1))
+    assert eval.expansion_iter < 20
+
+@wf.action_def
+def _make_array(n: int) -> wf.Any:
+    np = pytest.importorskip("numpy")
+    return np.arange(n)
+
+@wf.workflow
+def pass_arrays(n):
+    return wf.ForEach(wf.lazy(wf.Pass, wf.empty), [_make_array(n), _make_array(n + 1)])
+
+def test_for_each_untyped_items():
+    # items need not to be VISIP typed values, e.g. NumPy arrays
+    pytest.importorskip("numpy")
+    eval = evaluation.Evaluation()
+    result = eval.run(pass_arrays, 2)
+    assert [list(a) for a in result.result] == [[0, 1], [0, 1, 2]]
+    for_each = result.child('pass_arrays_1').child('ForEach_1')
+    assert list(for_each.child('item_1').result) == [0, 1, 2]
+
+@wf.action_def
+def _is_even(i: int) -> bool:
+    return i % 2 == 0
+
+@wf.action_def
+def _half(i: int) -> int:
+    return i // 2
+
+@wf.workflow
+def _halve_even(i):
+    return wf.If(_is_even(i), wf.lazy(_half, i), wf.lazy(wf.Pass, i))
+
+@wf.workflow
+def halve_even(items):
+    return wf.ForEach(_halve_even, items)
+
+def test_blocked_expansion(monkeypatch):
+    # Blocked If tasks are expanded again only after their inputs are finished.
+    n_expand = 0
+    expand = task.Composed.expand
+    def counted_expand(*args, **kwargs):
+        nonlocal n_expand
+        n_expand += 1
+        return expand(*args, **kwargs)
+    monkeypatch.setattr(task.Composed, 'expand', counted_expand)
+
+    n_items = 100
+    cache = evaluation.ResultCache()
+    resource = evaluation.ThreadPoolResource(cache, n_threads=1)
+    scheduler = evaluation.Scheduler([resource], cache)
+    eval = evaluation.Evaluation(scheduler=scheduler, fusion_time=None)
+    result = eval.run(halve_even, list(range(n_items))).result
+    resource.shutdown()
+    assert result == [i // 2 if i % 2 == 0 else i for i in range(n_items)]
+    assert n_expand < 20 * n_items
+
 # @wf.action_def
 # def condition(lst:wf.List[float], num:float, end:float) -> bool:
 #     return num < end
@@ -117,4 +117,22 @@ def test_workflow_parameters():
     :return:
     """
     res = evaluation.run(var_args, 1, 2, 3)
-    assert res == [1,2,3]
\ No newline at end of file
+    assert res == [1,2,3]
+
+@wf.workflow
+def increment(a: int):
+    return a + 1
+
+def test_expansion_plan():
+    assert evaluation.run(increment, 1) == 2
+    assert evaluation.run(increment, 1) == 2
+    # The modified workflow is expanded according to the new definition.
+    workflow = increment.workflow
+    add_call = workflow.result_call.arguments[0].value
+    assert workflow.set_action_input(add_call, 1, workflow.slots[0])
+    assert evaluation.run(increment, 3) == 6
+
+    # Renamed calls are expanded under the new name.
+    add_call.set_name('renamed')
+    result = evaluation.Evaluation().run(increment, 3)
+    assert result.child('increment_1').child('renamed').result == 6
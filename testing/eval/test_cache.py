@@ -0,0 +1,79 @@
+import os
+import visip as wf
+from visip.dev import evaluation
+from visip.eval.cache import ResultCache, DiskResultCache, BoundedResultCache
+
+n_calls = 0
+
+@wf.action_def
+def count_square(a: int) -> int:
+    global n_calls
+    n_calls += 1
+    return a * a
+
+
+@wf.analysis
+def squares():
+    return [count_square(i) for i in range(3)]
+
+
+def test_disk_cache(tmp_path):
+    cache = DiskResultCache(str(tmp_path), mmap_threshold=100)
+    cache.insert(b'\x01\x02', [1, 2, 3])
+    cache.insert(b'\x01\x03', b'x' * 1000)
+    closure = lambda x: x
+    cache.insert(b'\x01\x04', closure)
+    assert sorted(os.listdir(tmp_path / '01')) == ['02', '03']
+
+    reopened = DiskResultCache(str(tmp_path), mmap_threshold=100)
+    assert reopened.value(b'\x01\x02') == [1, 2, 3]
+    assert reopened.value(b'\x01\x03') == b'x' * 1000
+    assert reopened.value(b'\x01\x04') is ResultCache.NoValue
+    assert cache.value(b'\x01\x04') is closure
+    assert cache.is_finished(b'\x01\x04')
+
+
+def test_evaluation_reuse(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    result = evaluation.Evaluation(cache=DiskResultCache(cache_dir)).run(squares).result
+    assert result == [0, 1, 4]
+    assert n_calls == 3
+    result = evaluation.Evaluation(cache=DiskResultCache(cache_dir)).run(squares).result
+    assert result == [0, 1, 4]
+    assert n_calls == 3
+
+
+def test_bounded_cache(tmp_path):
+    cache = BoundedResultCache(byte_budget=2500, spill_dir=str(tmp_path))
+    cache.needed_hashes = lambda: {b'\x00\x00'}
+    cache.insert(b'\x00\x00', b'a' * 1000)
+    cache.insert(b'\x01\x00', b'b' * 1000)
+    cache.insert(b'\x02\x00', b'c' * 1000)
+    # b'\x00\x00' is needed, b'\x01\x00' is spilled
+    assert cache.stats.n_evicted == 1
+    assert list(cache.cache.keys()) == [b'\x00\x00', b'\x02\x00']
+    assert cache.stats.bytes_in_memory <= 2500
+    assert cache.value(b'\x01\x00') == b'b' * 1000
+    assert cache.stats.n_spill_loads == 1
+    assert cache.is_finished(b'\x01\x00')
+    assert cache.value(b'\x03\x00') is ResultCache.NoValue
+
+    closure = lambda x: x
+    cache.insert(b'\x04\x00', closure)
+    cache.insert(b'\x05\x00', b'd' * 2000)
+    assert cache.value(b'\x04\x00') is closure
+
+    # the held value is spilled when not needed anymore, the closure is never spilled
+    cache.needed_hashes = set
+    cache.insert(b'\x06\x00', b'e' * 2000)
+    assert not b'\x00\x00' in cache.cache
+    assert cache.value(b'\x00\x00') == b'a' * 1000
+    assert cache.value(b'\x04\x00') is closure
+    assert cache.stats.bytes_in_memory <= 2500
+
+
+def test_evaluation_bounded_cache(tmp_path):
+    cache = BoundedResultCache(byte_budget=0, spill_dir=str(tmp_path))
+    result = evaluation.Evaluation(cache=cache).run(squares).result
+    assert result == [0, 1, 4]
+    assert cache.stats.n_evicted > 0
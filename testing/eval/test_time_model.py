@@ -0,0 +1,65 @@
+import os
+import time
+import pytest
+import visip as wf
+from visip.dev import evaluation
+from visip.action.constructor import Value
+from visip.eval.time_model import ExecutionTimeModel
+
+SLEEP_TIME = 0.05
+
+@wf.action_def
+def sleep_id(i: int) -> int:
+    time.sleep(SLEEP_TIME)
+    return i
+
+
+@wf.workflow
+def sleep_pair(i):
+    return [sleep_id(i), sleep_id(i + 1)]
+
+
+@wf.analysis
+def sleeps():
+    return [sleep_pair(0), sleep_pair(2)]
+
+
+def test_time_model(tmp_path):
+    path = str(tmp_path / "model.json")
+    action = sleep_id._action_value
+    model = ExecutionTimeModel(path, default_time=2.0, max_samples=3)
+    assert model.predict(action) == 2.0
+    for t in [1.0, 3.0]:
+        model.record(action, t)
+    assert model.predict(action) == pytest.approx(2.0)
+    assert model.std(action) == pytest.approx(1.0)
+    for t in [4.0, 4.0, 4.0, 4.0]:
+        model.record(action, t)
+    # old samples are forgotten
+    assert model.n_samples(action) == 3
+    assert 3.5 < model.predict(action) < 4.0
+    # meta actions are not modeled
+    model.record(Value(1), 1.0)
+    assert model.n_samples(Value(1)) == 0
+    model.save()
+
+    loaded = ExecutionTimeModel(path)
+    assert loaded.predict(action) == model.predict(action)
+
+
+def test_evaluation_time_model(tmp_path):
+    workspace = str(tmp_path)
+    result = evaluation.Evaluation(workspace=workspace, persistent=True).run(sleeps).result
+    assert result == [[0, 1], [2, 3]]
+
+    model = evaluation.Evaluation(workspace=workspace, persistent=True).time_model
+    assert model.n_samples(sleep_id._action_value) == 4
+    assert model.predict(sleep_id._action_value) == pytest.approx(SLEEP_TIME, rel=0.5)
+    # workflows are measured from the expansion to the result
+    assert model.n_samples(sleep_pair.workflow) == 2
+    assert SLEEP_TIME <= model.predict(sleep_pair.workflow) < model.default_time
+
+    # no files in the workspace by default
+    workspace = str(tmp_path / "default")
+    evaluation.Evaluation(workspace=workspace).run(sleeps)
+    assert os.listdir(workspace) == []